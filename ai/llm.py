@@ -75,7 +75,8 @@ class LLMService:
                 logger.info(f"📝 [PROMPT_DEBUG] Final system prompt length: {len(system_prompt)} chars")
                 logger.info(f"📝 [PROMPT_DEBUG] Final system prompt:\n{system_prompt}")
                 
-                messages.insert(0, {"role": "system", "content": system_prompt})
+                # 呼び出し元の履歴リストは変更しない
+                messages = [{"role": "system", "content": system_prompt}, *messages]
             
             # Use synchronous API call in async context
             import asyncio
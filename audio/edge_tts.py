@@ -43,6 +43,17 @@ class EdgeTTSService:
             logger.error(f"❌ [EDGE_TTS] Stack trace: {traceback.format_exc()}")
             return []
     
+    async def stream_speech(self, text: str):
+        """セグメント単位でOpusフレームリストを順次返す（最初のセグメントは全文の合成を待たずに送信可能）"""
+        text_segments = self._split_text_by_length(text, 40)
+        if len(text_segments) > 1:
+            logger.info(f"🔄 [EDGE_TTS] Streaming {len(text_segments)} segments for: '{text[:30]}...'")
+        for i, segment in enumerate(text_segments):
+            segment_frames = await self._generate_single_segment(segment)
+            if segment_frames:
+                logger.info(f"🔄 [EDGE_TTS] Segment {i+1}/{len(text_segments)} ready: {len(segment_frames)} frames")
+                yield segment_frames
+    
     async def _generate_single_segment(self, text: str) -> list:
         """単一セグメントの音声生成"""
         try:
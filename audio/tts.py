@@ -1,3 +1,4 @@
+import struct
 import openai
 import opuslib_next
 from pydub import AudioSegment
@@ -9,6 +10,9 @@ from .voicevox_tts import VoicevoxTTSService
 
 logger = setup_logger()
 
+# BinaryProtocol3ヘッダー: type(1) + reserved(1) + payload_size(2)（ネットワークバイトオーダー）
+_BP3_HEADER = struct.Struct('>BBH')
+
 class TTSService:
     def __init__(self):
         # 3段階フォールバック準備
@@ -26,31 +30,45 @@ class TTSService:
         logger.info(f"TTSService OpenAI TTS fallback prepared: {self.openai_voice}")
 
     async def generate_speech(self, text: str) -> bytes:
-        """3段階フォールバック: VOICEVOX → EdgeTTS → OpenAI TTS"""
+        """3段階フォールバック: VOICEVOX → EdgeTTS → OpenAI TTS（stream_speechの全セグメントを連結して返す）"""
+        opus_frames = []
         try:
-            # 1st Try: VOICEVOX（可愛い日本語音声）
-            if Config.USE_VOICEVOX:
-                try:
-                    logger.info(f"🎵 [VOICEVOX] Using VOICEVOX for text: {text[:50]}...")
-                    return await self.voicevox.generate_speech(text)
-                except Exception as voicevox_error:
-                    logger.error(f"⚠️ [VOICEVOX_FAILED] VOICEVOX failed: {voicevox_error}")
-            
-            # 2nd Try: EdgeTTS（日本語音声）
-            if Config.USE_EDGE_TTS:
-                try:
-                    logger.info(f"🔄 [FALLBACK_EDGE] Switching to EdgeTTS...")
-                    return await self.edge_tts.generate_speech(text)
-                except Exception as edge_error:
-                    logger.error(f"⚠️ [EDGE_TTS_FAILED] EdgeTTS fallback failed: {edge_error}")
-            
-            # 3rd Try: OpenAI TTS（最終フォールバック）
-            logger.info(f"🔄 [FALLBACK_OPENAI] Switching to OpenAI TTS as final fallback...")
-            return await self._generate_openai_speech(text)
-            
+            async for chunk in self.stream_speech(text):
+                opus_frames.extend(chunk)
         except Exception as e:
             logger.error(f"TTS generation completely failed: {e}")
             return b""
+        return opus_frames or b""
+    
+    async def stream_speech(self, text: str):
+        """生成できた単位ごとにOpusフレームリストを返す（フォールバック順: VOICEVOX → EdgeTTS → OpenAI TTS）"""
+        # 1st Try: VOICEVOX（合成は一括のため1回で返す）
+        if Config.USE_VOICEVOX:
+            try:
+                logger.info(f"🎵 [VOICEVOX] Using VOICEVOX for text: {text[:50]}...")
+                opus_frames = await self.voicevox.generate_speech(text)
+            except Exception as voicevox_error:
+                logger.error(f"⚠️ [VOICEVOX_FAILED] VOICEVOX failed: {voicevox_error}")
+            else:
+                yield opus_frames
+                return
+        
+        # 2nd Try: EdgeTTS（長文はセグメント毎に返す）
+        if Config.USE_EDGE_TTS:
+            logger.info(f"🔄 [FALLBACK_EDGE] Switching to EdgeTTS...")
+            produced = False
+            async for opus_frames in self.edge_tts.stream_speech(text):
+                produced = True
+                yield opus_frames
+            if produced:
+                return
+            logger.error(f"⚠️ [EDGE_TTS_FAILED] EdgeTTS produced no audio")
+        
+        # 3rd Try: OpenAI TTS（最終フォールバック）
+        logger.info(f"🔄 [FALLBACK_OPENAI] Switching to OpenAI TTS as final fallback...")
+        opus_frames = await self._generate_openai_speech(text)
+        if opus_frames:
+            yield opus_frames
     
     async def _generate_openai_speech(self, text: str) -> bytes:
         """OpenAI TTS音声生成（フォールバック用）"""
@@ -169,8 +187,6 @@ class TTSService:
     def _add_binary_protocol3_header(self, opus_data: bytes) -> bytes:
         """ESP32 BinaryProtocol3ヘッダーを追加"""
         try:
-            import struct
-            
             # BinaryProtocol3構造:
             # uint8_t type;           // 0 = OPUS audio data
             # uint8_t reserved;       // 予約領域 (0)
@@ -181,11 +197,10 @@ class TTSService:
             reserved_field = 0  # 予約領域
             payload_size = len(opus_data)
             
-            # ネットワークバイトオーダー (big-endian) でパック
-            header = struct.pack('>BBH', type_field, reserved_field, payload_size)
-            
-            # ヘッダー + Opusデータ
-            protocol_data = header + opus_data
+            # ヘッダー + Opusデータを1回の確保で組み立て（ヘッダー用の中間bytesを作らない）
+            protocol_data = bytearray(_BP3_HEADER.size + payload_size)
+            _BP3_HEADER.pack_into(protocol_data, 0, type_field, reserved_field, payload_size)
+            protocol_data[_BP3_HEADER.size:] = opus_data
             
             logger.debug(f"BinaryProtocol3 header: type={type_field}, reserved={reserved_field}, payload_size={payload_size}")
             return protocol_data
@@ -7,29 +7,50 @@ import json
 import struct
 import time
 import io
-import wave
-import uuid
-from typing import List, Optional
+from collections import deque
+from itertools import islice
+from typing import Optional, Sequence
 from utils.logger import setup_logger
 
 logger = setup_logger()
 
+# ASR用に保持する直近Opusフレーム数（60ms/フレーム → 約6秒）
+_ASR_MAX_FRAMES = 100
+
+# ASR用WAVは16kHz mono 16bit固定: wave.open を使わずヘッダを直接書き込む
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')  # RIFF + fmt(PCM) + data チャンク = 44バイト
+
+
+def _pack_wav_header_into(buffer: bytearray, pcm_len: int):
+    """buffer先頭44バイトに16kHz mono 16bit PCMのWAVヘッダを書き込む"""
+    _WAV_HEADER.pack_into(
+        buffer, 0,
+        b'RIFF', 36 + pcm_len, b'WAVE',
+        b'fmt ', 16, 1, 1, 16000, 32000, 2, 16,  # PCM, mono, 16kHz, byte_rate, block_align, 16bit
+        b'data', pcm_len,
+    )
+
 class AudioHandlerServer2:
     def __init__(self, websocket_handler):
         self.handler = websocket_handler
-        self.asr_audio = []  # List of Opus frames
+        # 入口ゲート: この時刻(monotonic ms)まで受信音声を破棄（AI発話中は無限大）
+        self._client_is_speaking = False
+        self._tts_cooldown_until = 0
+        self.gate_until_ms = 0
+        self.asr_audio = deque(maxlen=_ASR_MAX_FRAMES)  # Opus frames（上限超過時は古いフレームから自動破棄）
         self.client_have_voice = False
         self.client_voice_stop = False
-        self.last_activity_time = time.time() * 1000
+        self.last_activity_time = time.monotonic_ns() // 1_000_000
         
         # RMSベース音声検知システム (server2準拠)
         self.client_have_voice = False
-        self.last_voice_activity_time = time.time() * 1000  # milliseconds
+        self.last_voice_activity_time = time.monotonic_ns() // 1_000_000  # milliseconds (monotonic)
         self.silence_threshold_ms = 500  # 0.5秒無音で処理開始 (短縮)
         self.rms_threshold = 250  # RMS閾値を上げて過敏反応を抑制
         self.voice_frame_count = 0  # 連続音声フレーム数
         self.silence_frame_count = 0  # 連続無音フレーム数
         self.is_processing = False  # 重複処理防止フラグ
+        self._asr_processing = False  # ASR重複処理防止フラグ
         self.tts_in_progress = False  # TTS中は音声検知一時停止
         self.client_is_speaking = False  # AI発話中フラグ（server2準拠エコー防止）
         
@@ -44,6 +65,8 @@ class AudioHandlerServer2:
         # TTS終了後クールダウン（音響回り込み防止）
         self.tts_cooldown_until = 0  # この時間まで音声処理をスキップ
         self.tts_cooldown_ms = 1200  # TTS終了後1200msクールダウン（残響も含めたエコー完全除去）
+        self._cooldown_log_count = 0  # クールダウン中破棄ログの間引きカウンタ
+        self.last_dtx_time = 0  # 1バイトDTX keepaliveの最終許可時刻(ms)
         
         # Initialize Opus decoder
         try:
@@ -54,12 +77,34 @@ class AudioHandlerServer2:
             logger.error(f"Failed to initialize Opus decoder: {e}")
             self.opus_decoder = None
 
+    @property
+    def client_is_speaking(self) -> bool:
+        return self._client_is_speaking
+
+    @client_is_speaking.setter
+    def client_is_speaking(self, value: bool):
+        self._client_is_speaking = value
+        self._update_gate()
+
+    @property
+    def tts_cooldown_until(self):
+        return self._tts_cooldown_until
+
+    @tts_cooldown_until.setter
+    def tts_cooldown_until(self, value):
+        self._tts_cooldown_until = value
+        self._update_gate()
+
+    def _update_gate(self):
+        """発話フラグ・クールダウン変更時に入口ゲート時刻を再計算"""
+        self.gate_until_ms = float('inf') if self._client_is_speaking else self._tts_cooldown_until
+
     async def handle_audio_frame(self, audio_data: bytes):
         """Handle single audio frame with RMS-based silence detection (server2準拠)"""
         try:
             # "入口"で即return（最優先）: AI発言中とクールダウン中のチェック
             # 🎯 [MONOTONIC_TIME] 単一時基統一
-            current_time = time.monotonic() * 1000
+            current_time = time.monotonic_ns() // 1_000_000
             
             # 1. AI発言中完全ブロック（バッファに積まない）
             if self.client_is_speaking:
@@ -70,8 +115,6 @@ class AudioHandlerServer2:
             if current_time < self.tts_cooldown_until:
                 remaining_ms = int(self.tts_cooldown_until - current_time)
                 # ログ頻度制限
-                if not hasattr(self, '_cooldown_log_count'):
-                    self._cooldown_log_count = 0
                 self._cooldown_log_count += 1
                 if self._cooldown_log_count % 10 == 0:
                     logger.info(f"❄️ [COOLDOWN] TTS残響期間中: 残り{remaining_ms}ms (過去10フレーム破棄)")
@@ -79,11 +122,12 @@ class AudioHandlerServer2:
             
             # 注意: DTXフィルタはConnection Handlerで既に処理済み
             # ここでは音声処理のみ実行
+            
+            # 入口ガード通過後に初めてbytes化（memoryview受信時のみコピー、opuslibはbytes必須）
+            audio_data = bytes(audio_data)
                 
             # 1バイトDTXは追加で500ms制限（二重防御）
             if len(audio_data) == 1:
-                if not hasattr(self, 'last_dtx_time'):
-                    self.last_dtx_time = 0
                 if current_time - self.last_dtx_time < 500:
                     return
                 self.last_dtx_time = current_time
@@ -114,7 +158,6 @@ class AudioHandlerServer2:
                 dtx_drop = getattr(self, 'dtx_drop_count', 0)
                 cooldown_active = current_time < self.tts_cooldown_until
                 logger.info(f"📦 [FRAME_ACCUMULATION] 蓄積フレーム数: {len(self.asr_audio)}, 最新フレーム: {len(audio_data)}B, 音声検知: {is_voice}, DTXドロップ: {dtx_drop}, クールダウン: {cooldown_active}")
-            self.asr_audio = self.asr_audio[-100:]  # Keep more frames
             
             # logger.info(f"[AUDIO_TRACE] Frame: {len(audio_data)}B, RMS_voice={is_voice}, frames={len(self.asr_audio)}")  # レート制限対策で削除
             
@@ -167,11 +210,11 @@ class AudioHandlerServer2:
         """Process accumulated audio when voice stops (server2 style)"""
         try:
             # 新しいリクエストID生成
-            rid = str(uuid.uuid4())[:8]
+            rid = self.handler._next_rid()
             self.current_request_id = rid
             
             # 🎯 検索可能ログ: handle_voice_stop
-            logger.info(f"🔥 RID[{rid}] HANDLE_VOICE_STOP_START: frames={len(self.asr_audio)}, is_processing={self.is_processing}, tts_active={getattr(self.handler, 'tts_active', False)}")
+            logger.info(f"🔥 RID[{rid}] HANDLE_VOICE_STOP_START: frames={len(self.asr_audio)}, is_processing={self.is_processing}, tts_active={self.handler.tts_active}")
             
             # TTS中は音声処理を完全に無視
             if self.tts_in_progress:
@@ -197,15 +240,15 @@ class AudioHandlerServer2:
                 self._reset_audio_state()
                 return
 
-            # Process accumulated frames
-            audio_frames = self.asr_audio.copy()
+            # Process accumulated frames（リセットはバッファを差し替えるためコピー不要）
+            audio_frames = self.asr_audio
             self._reset_audio_state()
             
             logger.info(f"🔥 RID[{rid}] HANDLE_VOICE_STOP_PROCESSING: Converting {len(audio_frames)} frames to WAV")
             
             # フレーム詳細分析
-            total_bytes = sum(len(frame) for frame in audio_frames)
-            frame_sizes = [len(frame) for frame in audio_frames[:10]]  # 最初の10フレーム
+            total_bytes = sum(map(len, audio_frames))
+            frame_sizes = list(map(len, islice(audio_frames, 10)))  # 最初の10フレーム（dequeはスライス不可）
             logger.info(f"🔥 RID[{rid}] FRAME_ANALYSIS: total_bytes={total_bytes}, frame_sizes={frame_sizes}...")
             
             # Convert to WAV using server2 method
@@ -220,7 +263,7 @@ class AudioHandlerServer2:
         except Exception as e:
             logger.error(f"Error processing voice stop: {e}")
 
-    async def _opus_frames_to_wav(self, opus_frames: List[bytes]) -> Optional[bytes]:
+    async def _opus_frames_to_wav(self, opus_frames: Sequence[bytes]) -> Optional[bytearray]:
         """Convert Opus frames to WAV (server2 style)"""
         try:
             if not self.opus_decoder:
@@ -228,8 +271,11 @@ class AudioHandlerServer2:
                 return None
 
             # Decode Opus frames to PCM (server2 style)
-            pcm_data = []
+            # WAVヘッダ分を空けて事前確保したバッファへ1パケットずつ書き込み（中間コピーを作らない）
             buffer_size = 960  # 60ms at 16kHz
+            header_size = _WAV_HEADER.size
+            wav_data = bytearray(header_size + len(opus_frames) * buffer_size * 2)  # 16bit mono
+            offset = header_size
             
             for i, opus_packet in enumerate(opus_frames):
                 try:
@@ -238,29 +284,21 @@ class AudioHandlerServer2:
                     
                     pcm_frame = self.opus_decoder.decode(opus_packet, buffer_size)
                     if pcm_frame and len(pcm_frame) > 0:
-                        pcm_data.append(pcm_frame)
+                        wav_data[offset:offset + len(pcm_frame)] = pcm_frame
+                        offset += len(pcm_frame)
                         
                 except Exception as e:
                     logger.warning(f"Opus decode error, skip packet {i}: {e}")
                     continue
 
-            if not pcm_data:
+            pcm_len = offset - header_size
+            if not pcm_len:
                 logger.warning("No valid PCM data from Opus frames")
                 return None
-
-            # Create WAV file from PCM data (server2 style)
-            wav_buffer = io.BytesIO()
-            with wave.open(wav_buffer, 'wb') as wav_file:
-                wav_file.setnchannels(1)      # mono
-                wav_file.setsampwidth(2)      # 16-bit
-                wav_file.setframerate(16000)  # 16kHz
-                wav_file.writeframes(b''.join(pcm_data))
-            
-            wav_buffer.seek(0)
-            wav_data = wav_buffer.read()
+            del wav_data[offset:]
+            _pack_wav_header_into(wav_data, pcm_len)
             
-            total_pcm_bytes = sum(len(frame) for frame in pcm_data)
-            logger.info(f"[AUDIO_TRACE] Opus->WAV: {len(opus_frames)} frames -> {total_pcm_bytes} PCM bytes -> {len(wav_data)} WAV bytes")
+            logger.info(f"[AUDIO_TRACE] Opus->WAV: {len(opus_frames)} frames -> {pcm_len} PCM bytes -> {len(wav_data)} WAV bytes")
             
             return wav_data
 
@@ -268,17 +306,17 @@ class AudioHandlerServer2:
             logger.error(f"Error converting Opus to WAV: {e}")
             return None
 
-    async def _process_with_asr(self, wav_data: bytes, rid: str = None):
+    async def _process_with_asr(self, wav_data: bytearray, rid: str = None):
         """Process WAV data with ASR"""
         try:
             if not rid:
-                rid = str(uuid.uuid4())[:8]
+                rid = self.handler._next_rid()
             
             # 🎯 検索可能ログ: ASR処理開始
             logger.info(f"🔥 RID[{rid}] ASR_START: wav_size={len(wav_data)}")
             
             # ASR重複処理防止
-            if hasattr(self, '_asr_processing') and self._asr_processing:
+            if self._asr_processing:
                 logger.warning(f"🚨 [ASR_DUPLICATE_PREVENT] ASR already in progress, skipping")
                 return
                 
@@ -310,7 +348,7 @@ class AudioHandlerServer2:
             
             # TTS中は is_processing を維持（TTS中断防止）
             # WebSocketハンドラのtts_activeとtts_in_progressの両方をチェック
-            tts_active = getattr(self.handler, 'tts_active', False) if hasattr(self, 'handler') else False
+            tts_active = self.handler.tts_active
             
             if not self.tts_in_progress and not tts_active:
                 self.is_processing = False
@@ -386,14 +424,27 @@ class AudioHandlerServer2:
             logger.error(f"VAD detection error: {e}")
             return len(audio_data) > 20  # Safe fallback
 
+    def _drop_asr_frames(self) -> int:
+        """蓄積中のASRフレームを破棄し、破棄したフレーム数を返す（新しいバッファへ差し替え）"""
+        cleared = len(self.asr_audio)
+        self.asr_audio = deque(maxlen=_ASR_MAX_FRAMES)
+        return cleared
+
+    def reset_listen_state(self) -> int:
+        """listen開始/TTS終了時のASRバッファ・VAD状態リセット（破棄したフレーム数を返す）"""
+        cleared = self._drop_asr_frames()
+        self.silence_frame_count = 0
+        self.wake_until = 0
+        return cleared
+
     def _reset_audio_state(self):
         """Reset audio state (server2 style with RMS VAD reset)"""
-        self.asr_audio.clear()
+        self.asr_audio = deque(maxlen=_ASR_MAX_FRAMES)
         self.client_have_voice = False
         self.client_voice_stop = False
         self.voice_frame_count = 0
         self.silence_frame_count = 0
-        self.last_voice_activity_time = time.time() * 1000
+        self.last_voice_activity_time = time.monotonic_ns() // 1_000_000
         
         # TTS中は is_processing をリセットしない（TTS中断防止）
         if not self.tts_in_progress:
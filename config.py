@@ -32,6 +32,7 @@ class Config:
     # TTS設定（Server2互換）
     USE_EDGE_TTS: bool = os.getenv("USE_EDGE_TTS", "true").lower() == "true"  # 緊急時OpenAI TTSに切り替え
     EDGE_TTS_VOICE: str = os.getenv("EDGE_TTS_VOICE", "ja-JP-NanamiNeural")  # 日本語女性音声（ネコ太用）
+    TTS_SEND_BATCH_FRAMES: int = max(1, int(os.getenv("TTS_SEND_BATCH_FRAMES", "3")))  # TTS送信時に連続送信するOpusフレーム数（待機はバッチ毎）
     
     # VOICEVOX設定（可愛い日本語音声）
     USE_VOICEVOX: bool = os.getenv("USE_VOICEVOX", "false").lower() == "true"  # VOICEVOX ENGINE準備中はfalse
@@ -50,9 +51,11 @@ class Config:
     # WebSocket接続設定
     WEBSOCKET_TIMEOUT_SECONDS: int = int(os.getenv("WEBSOCKET_TIMEOUT_SECONDS", "300"))  # 5分
     WEBSOCKET_HEARTBEAT_SECONDS: int = int(os.getenv("WEBSOCKET_HEARTBEAT_SECONDS", "30"))  # Ping/Pong間隔
+    WEBSOCKET_SNDBUF_BYTES: int = int(os.getenv("WEBSOCKET_SNDBUF_BYTES", "0"))  # WSソケットの送信バッファ（0=OS既定のまま）
     
     # ログ設定
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    FILE_LOG_LEVEL: str = os.getenv("FILE_LOG_LEVEL", "DEBUG")  # ファイル出力のレベル（INFO以上にするとDEBUGログの整形自体を省略）
     
     @classmethod
     def validate(cls) -> None:
@@ -23,21 +23,31 @@ class Server2StyleConnectionHandler:
         self.rx_bytes_since_listen = 0
         self.utt_seq = 0
         
-        # DTX制御
+        # DTX制御（閾値は接続時に1回だけ読み込み、フレーム毎に環境変数を解析しない）
         self.dtx_drop_count = 0
+        try:
+            self.dtx_threshold = int(os.getenv("DTX_THRESHOLD", "12"))
+        except Exception as e:
+            logger.error(f"🚨 [BINARY_ERROR] DTX_THRESHOLD invalid, using 12: {e}")
+            self.dtx_threshold = 12
+        try:
+            self.dtx_threshold_handler = int(os.getenv("DTX_THRESHOLD_HANDLER", "8"))  # より大きな閾値で二重防御
+        except Exception:
+            self.dtx_threshold_handler = 8
         
         # AI発言中ブロック統計
         self.blocked_frames = 0
         self.blocked_bytes = 0
+        self._block_counter = 0
         
-    async def route_message(self, message: bytes, audio_handler):
-        """Server2準拠のメッセージルーティング"""
+    async def route_message(self, message, audio_handler):
+        """Server2準拠のメッセージルーティング（bytes / memoryview を受け付ける）"""
         try:
-            if isinstance(message, bytes):
+            if isinstance(message, (bytes, bytearray, memoryview)):
                 result = await self._handle_binary_message(message, audio_handler)
                 return result
             else:
-                logger.warning(f"⚠️ [CONNECTION_ROUTE] Non-bytes message: {type(message)}")
+                logger.warning(f"⚠️ [CONNECTION_ROUTE] Non-buffer message: {type(message)}")
                 return None
         except Exception as e:
             logger.error(f"🚨S2🚨 ★TEST★ [CONNECTION_ERROR] route_message failed: {e}")
@@ -54,7 +64,7 @@ class Server2StyleConnectionHandler:
         # Step 1: AI発言中完全ブロック（最優先・最確実）
         try:
             # AI発言中フラグチェック（シンプル・確実）
-            client_is_speaking = getattr(audio_handler, 'client_is_speaking', False)
+            client_is_speaking = audio_handler.client_is_speaking
             
             if client_is_speaking:
                 # AI発言中は全音声完全ブロック（バージイン無効）
@@ -62,8 +72,6 @@ class Server2StyleConnectionHandler:
                 self.blocked_bytes += len(message)
                 
                 # ログ頻度制限: 5フレームに1回のみ記録
-                if not hasattr(self, '_block_counter'):
-                    self._block_counter = 0
                 self._block_counter += 1
                 # C. DTXは"見ない" - DTXログも負荷軽減
                 if self._block_counter % 20 == 0:  # DTX含む大量フレーム対策で間隔延長
@@ -75,7 +83,7 @@ class Server2StyleConnectionHandler:
             
         # Step 2: Connection層DTXフィルタ (Server2 connection.py:375)
         try:
-            dtx_threshold = int(os.getenv("DTX_THRESHOLD", "12"))
+            dtx_threshold = self.dtx_threshold
             
             if len(message) <= dtx_threshold:
                 self.dtx_drop_count += 1
@@ -113,10 +121,7 @@ class Server2StyleConnectionHandler:
         """Server2 receiveAudioHandle.py準拠の処理"""
         
         # receiveAudioHandle DTXフィルタ (line 22) - より厳格に
-        try:
-            dtx_thr = int(os.getenv("DTX_THRESHOLD_HANDLER", "8"))  # より大きな閾値で二重防御
-        except Exception:
-            dtx_thr = 8
+        dtx_thr = self.dtx_threshold_handler
             
         if audio and len(audio) <= dtx_thr:
             try:
@@ -1,5 +1,6 @@
 import asyncio
 import signal
+import socket
 import sys
 import json
 import os
@@ -318,6 +319,20 @@ async def main():
         ws = web.WebSocketResponse(protocols=["v1", "xiaozhi-v1"], heartbeat=Config.WEBSOCKET_HEARTBEAT_SECONDS)
         await ws.prepare(request)
         
+        # TTS音声フレームは小さなWSメッセージの連続送信のため、Nagleによる遅延を明示的に無効化
+        sock = request.transport.get_extra_info('socket') if request.transport else None
+        if sock is not None:
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            except OSError as e:
+                logger.warning(f"TCP_NODELAY設定失敗: {e}")
+            # 送信バッファは環境変数で指定された場合のみ変更（TTSは50ms間隔の送信のため既定値で通常は十分）
+            if Config.WEBSOCKET_SNDBUF_BYTES > 0:
+                try:
+                    sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, Config.WEBSOCKET_SNDBUF_BYTES)
+                except OSError as e:
+                    logger.warning(f"SO_SNDBUF設定失敗: {e}")
+        
         # Get device info from headers
         headers = {k.lower(): v for k, v in request.headers.items()}
         device_id = headers.get("device-id")
@@ -657,6 +672,14 @@ async def main():
     logger.info("Server stopped.")
 
 if __name__ == "__main__":
+    # uvloopが利用可能ならイベントループに採用（WebSocket送受信のawait往復を高速化）
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        logger.info("uvloop event loop policy enabled")
+    except ImportError:
+        logger.info("uvloop not installed, using default asyncio event loop")
+    
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
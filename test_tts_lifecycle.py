@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+TTS送信タスクのライフサイクルテストスクリプト
+並行TTSの引き継ぎ、接続終了時のタスク後始末、入口ゲートの再計算を確認
+"""
+
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+
+# プロジェクトのルートディレクトリをPythonパスに追加
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+
+import websocket_handler
+from audio_handler_server2 import AudioHandlerServer2
+
+
+class FakeWebSocket:
+    """送信内容を記録するだけのWebSocket（受信はfeedで積んだメッセージを返す）"""
+
+    def __init__(self):
+        self.closed = False
+        self.close_code = None
+        self.sent_text = []
+        self.sent_bytes = []
+        self._writer = SimpleNamespace(transport=SimpleNamespace(is_closing=lambda: self.closed))
+        self._incoming = asyncio.Queue()
+
+    async def send_str(self, data):
+        self.sent_text.append(data)
+
+    async def send_bytes(self, data):
+        self.sent_bytes.append(data)
+
+    async def close(self):
+        self.closed = True
+        self.close_code = 1000
+
+    def exception(self):
+        return None
+
+    def feed(self, msg):
+        self._incoming.put_nowait(msg)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        return await self._incoming.get()
+
+
+class FakeTTSService:
+    """1セグメント目を返した後、holdがセットされるまで次セグメントの生成中のまま止まる
+    クローズには時間がかかる（中断されたTTSの後処理が次のTTS開始後にずれ込む状況を再現）"""
+
+    def __init__(self):
+        self.hold = asyncio.Event()
+        self.streams = []
+        self.closed_streams = []
+
+    async def stream_speech(self, text):
+        self.streams.append(text)
+        try:
+            yield [b"\x01" * 20] * 3
+            await self.hold.wait()
+            yield [b"\x02" * 20] * 3
+        finally:
+            self.closed_streams.append(text)
+            await asyncio.sleep(0.2)
+
+
+# 外部サービス（OpenAI・nekota-server）には接続しない
+websocket_handler.ASRService = lambda: None
+websocket_handler.LLMService = lambda: None
+websocket_handler.MemoryService = lambda: None
+websocket_handler.TTSService = FakeTTSService
+
+
+async def wait_until(predicate, timeout: float = 3.0):
+    """条件が満たされるまで待機（タイムアウトでAssertionError）"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "timed out waiting for condition"
+        await asyncio.sleep(0.01)
+
+
+async def test_parallel_tts_handover():
+    """送信中に次のTTSが来たら、録音再開を挟まずゲートを閉じたまま引き継ぐ"""
+    print("\n🔁 === 並行TTS引き継ぎテスト ===")
+
+    gate_log = []
+    update_gate = AudioHandlerServer2._update_gate
+
+    def recording_update_gate(self):
+        update_gate(self)
+        gate_log.append(self.gate_until_ms)
+
+    AudioHandlerServer2._update_gate = recording_update_gate
+    handler = websocket_handler.ConnectionHandler(FakeWebSocket(), {"device-id": "test-parallel"})
+    try:
+        ws = handler.websocket
+        tts = handler.tts_service
+        audio_handler = handler.audio_handler
+
+        first = asyncio.ensure_future(handler.send_audio_response("一つ目", "rid-1"))
+        await wait_until(lambda: ws.sent_bytes)
+        first_task = handler._tts_task
+        sent_before = len(ws.sent_text)
+        gate_log.clear()
+
+        # 送信中に次のTTSを開始（アラーム通知など）
+        second = asyncio.ensure_future(handler.send_audio_response("二つ目", "rid-2"))
+        await wait_until(lambda: len(ws.sent_bytes) >= 6)
+
+        assert first.done() and first.exception() is None
+        assert first_task.cancelled()
+        assert tts.closed_streams == ["一つ目"]
+        assert handler._tts_task is not first_task and not handler._tts_task.done()
+        handover = ws.sent_text[sent_before:]
+        assert handler._listen_start_json not in handover
+        assert handler._tts_stop_json not in handover
+        assert handler._tts_start_json in handover
+        assert all(gate == float("inf") for gate in gate_log)
+        assert audio_handler.client_is_speaking
+        assert audio_handler.tts_in_progress
+        assert audio_handler.is_processing
+        assert handler._flag_off_task is None
+        print(f"✅ 引き継ぎ中の送信: {len(handover)}件（録音再開・TTS停止なし）、ゲート閉鎖維持")
+
+        # 二つ目を最後まで送信させ、フラグOFFタスクは二つ目のものだけ
+        tts.hold.set()
+        await second
+        assert tts.closed_streams == ["一つ目", "二つ目"]
+        flag_off = handler._flag_off_task
+        assert flag_off is not None and not flag_off.done()
+        flag_off.cancel()
+        await asyncio.gather(flag_off, return_exceptions=True)
+        print("✅ 二つ目の送信完了後にフラグOFFタスクを1つだけ作成")
+    finally:
+        AudioHandlerServer2._update_gate = update_gate
+        websocket_handler.connected_devices.pop("test-parallel", None)
+
+
+async def test_run_exit_cleanup():
+    """run()終了時にTTS・フラグOFF・アラームのタスクを全て終了させる"""
+    print("\n🧹 === 接続終了時の後始末テスト ===")
+
+    async def idle_alarm_checker(self):
+        await asyncio.Event().wait()
+
+    async def no_pending_alarms(self):
+        return None
+
+    handler_class = websocket_handler.ConnectionHandler
+    start_alarm_checker = handler_class.start_alarm_checker
+    check_pending_alarms = handler_class._check_pending_alarms
+    handler_class.start_alarm_checker = idle_alarm_checker
+    handler_class._check_pending_alarms = no_pending_alarms
+    try:
+        handler = handler_class(FakeWebSocket(), {"device-id": "test-run-exit"})
+        ws = handler.websocket
+        tts = handler.tts_service
+
+        run_task = asyncio.ensure_future(handler.run())
+        speak = asyncio.ensure_future(handler.send_audio_response("送信中", "rid-run"))
+        await wait_until(lambda: ws.sent_bytes)
+        tts_task = handler._tts_task
+
+        # TTS送信中に端末側から切断
+        ws.feed(SimpleNamespace(type=web.WSMsgType.CLOSE, extra=None))
+        await run_task
+        await speak
+
+        assert tts_task.done()
+        assert tts.closed_streams == ["送信中"]
+        assert handler._tts_task is None
+        assert handler._flag_off_task is None or handler._flag_off_task.done()
+        assert handler.timeout_handle is None
+        pending = [task for task in asyncio.all_tasks() if task is not asyncio.current_task() and not task.done()]
+        assert pending == []
+        print("✅ 接続終了後に残ったタスクなし")
+    finally:
+        handler_class.start_alarm_checker = start_alarm_checker
+        handler_class._check_pending_alarms = check_pending_alarms
+        websocket_handler.connected_devices.pop("test-run-exit", None)
+
+
+async def test_gate_recompute():
+    """発話フラグ・クールダウンの変更で入口ゲート時刻を再計算"""
+    print("\n🚪 === 入口ゲート再計算テスト ===")
+
+    audio_handler = AudioHandlerServer2(None)
+    assert audio_handler.gate_until_ms == 0
+
+    audio_handler.tts_cooldown_until = 5000
+    assert audio_handler.gate_until_ms == 5000
+
+    audio_handler.client_is_speaking = True
+    assert audio_handler.gate_until_ms == float("inf")
+
+    # 発話中はクールダウンを更新してもゲートは閉じたまま
+    audio_handler.tts_cooldown_until = 7000
+    assert audio_handler.gate_until_ms == float("inf")
+
+    audio_handler.client_is_speaking = False
+    assert audio_handler.gate_until_ms == 7000
+    print("✅ 発話中は無限大、発話終了後はクールダウン時刻")
+
+
+async def main():
+    """メインテスト実行"""
+    print("🚀 TTSライフサイクルテスト開始")
+
+    await test_gate_recompute()
+    await test_parallel_tts_handover()
+    await test_run_exit_cleanup()
+
+    print("\n🎉 === テスト完了：全て成功しました！ ===")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -18,7 +18,7 @@ def setup_logger():
     # ファイル出力設定
     logger.add(
         "logs/xiaozhi-server3.log",
-        level="DEBUG",
+        level=Config.FILE_LOG_LEVEL,
         format="{time:YYYY-MM-DD HH:mm:ss} | {level:8} | {name}:{function}:{line} - {message}",
         rotation="1 day",
         retention="7 days",
@@ -1,15 +1,19 @@
 import asyncio
-import json
+import orjson
+import os
+import re
 import struct
+import sys
+import traceback
+import unicodedata
 import uuid
-import io
 import threading
 import time
 import aiohttp
+from collections import deque
 from typing import Dict, Any, Optional
 from datetime import datetime, timedelta
 import pytz
-from collections import deque
 from aiohttp import web
 
 class ConnectionClosedError(Exception):
@@ -24,9 +28,86 @@ from audio.tts import TTSService
 from ai.llm import LLMService
 from ai.memory import MemoryService
 from audio_handler_server2 import AudioHandlerServer2
+from core_connection_server2 import Server2StyleConnectionHandler
 
 logger = setup_logger()
 
+# バイナリプロトコルヘッダ（毎フレームのフォーマット文字列解析を避けるため事前コンパイル）
+_V2_HEADER = struct.Struct('>HHHII')  # version(2) + type(2) + reserved(2) + timestamp(4) + payload_size(4)
+_V3_HEADER = struct.Struct('>BBH')    # type(1) + reserved(1) + payload_size(2)
+
+# 受信フレームのサイズ分類（統計はこのインデックスのリストで保持）
+_SIZE_DTX, _SIZE_SMALL, _SIZE_NORMAL, _SIZE_LARGE = range(4)
+_SIZE_CATEGORY_NAMES = ("DTX", "SMALL", "NORMAL", "LARGE")
+
+# 洪水検知（直近1秒のスライディング窓）
+_FLOOD_WINDOW_MS = 1000
+_FLOOD_ALERT_FRAMES = 20  # 警告ログ
+_FLOOD_DROP_FRAMES = 30   # 緊急破棄（ESP32の通常送信は60ms/フレーム≒17フレーム/秒）
+
+
+def _size_category(msg_size: int) -> int:
+    """受信フレームのサイズ分類（_SIZE_*）"""
+    if msg_size == 1:
+        return _SIZE_DTX
+    if msg_size < 50:
+        return _SIZE_SMALL
+    if msg_size < 150:
+        return _SIZE_NORMAL
+    return _SIZE_LARGE
+
+# 表示用テキストの先頭・末尾から除去する句読点・記号 + str.isspace()相当の空白文字
+_DISPLAY_STRIP_CHARS = (
+    "，。！？、；：（）【】「」『』〈〉《》,.!?;:()[]<>{}"
+    " \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f\x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005"
+    "\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+)
+
+# 記憶キーワード（呼び出し / 保存）: 1回の走査で判定
+_MEMORY_QUERY_RE = re.compile("覚えてる|記憶ある|教えて|何が好き|誕生日はいつ|知ってる|記憶してる")
+_MEMORY_SAVE_RE = re.compile("覚えといて|おぼえといて|覚えて|記憶して|おぼえて")
+
+# process_text のコマンド判定キーワード（キーワード毎の in 走査ではなく1回の走査で判定）
+_MESSAGE_CHECK_RE = re.compile("メッセージ来てる|お手紙来てる|新着")
+_FRIEND_MESSAGE_RE = re.compile(r'(.+?)からの?(メッセージ|お手紙).*?(なに|何|ある|来てる)')
+_ALARM_SET_RE = re.compile("起こして|アラーム|目覚まし|時に鳴らして")
+_ALARM_STOP_RE = re.compile("止めて|アラーム停止|もういい|起きた")
+_SLEEP_MODE_RE = re.compile("バイバイ|ばいばい|さようなら|おやすみ|待機して|待機モード|スリープ")
+
+class _LazyHex:
+    """ログ出力時にのみ先頭バイトをhex化する（loguruの{}引数に渡す）"""
+    __slots__ = ("data", "n")
+
+    def __init__(self, data, n: int = 8):
+        self.data = data
+        self.n = n
+
+    def __str__(self) -> str:
+        return self.data[:self.n].hex()
+
+def _ws_dead(ws) -> bool:
+    """送信不可（クローズ済み・writer未生成・トランスポート切断中）ならTrue"""
+    if ws.closed:
+        return True
+    writer = getattr(ws, '_writer', None)
+    if writer is None:
+        return True
+    transport = writer.transport
+    return transport is None or transport.is_closing()
+
+def _format_callers(frame, depth: int = 3) -> str:
+    """呼び出し元フレームを外側から順に file:line(func) で整形（ログ出力時のみ呼ぶ）"""
+    callers = []
+    while frame is not None and len(callers) < depth:
+        code = frame.f_code
+        callers.append(f"{code.co_filename}:{frame.f_lineno} in {code.co_name}")
+        frame = frame.f_back
+    return ' | '.join(f"Level{i}: {caller}" for i, caller in enumerate(reversed(callers)))
+
+def _orjson_dumps(obj) -> str:
+    """send_json用シリアライザ（ESP32はテキストフレーム必須のためstrで返す）"""
+    return orjson.dumps(obj).decode()
+
 # 接続中のデバイス管理（グローバル）
 connected_devices: Dict[str, 'ConnectionHandler'] = {}
 device_letter_states: Dict[str, bool] = {}  # デバイス別レター応答待ち状態
@@ -34,6 +115,36 @@ device_pending_letters: Dict[str, list] = {}  # デバイス別未読レター
 device_letter_retry_count: Dict[str, int] = {}  # デバイス別レター応答リトライ回数
 
 class ConnectionHandler:
+    # 接続毎の __dict__ を持たない（属性は全て __init__ で初期化すること）
+    __slots__ = (
+        "websocket", "headers", "device_id", "client_id", "protocol_version", "_parse_binary",
+        "session_id", "asr_service", "tts_service", "llm_service", "memory_service", "chat_history",
+        "client_is_speaking", "stop_event", "audio_format", "letter_state", "letter_message",
+        "letter_target_friend", "letter_suggested_friend", "letter_rid", "user_id",
+        "short_memory_processor", "last_alarm_error", "timer_process_count", "last_timer_text",
+        "features", "close_after_chat",
+        "client_have_voice", "client_voice_stop", "last_activity_time", "_activity_seq",
+        "_activity_seq_seen", "timeout_seconds", "_timeout_check_interval", "pending_alarms",
+        "alarm_ack_timeouts", "timeout_handle", "_tts_idle", "_tts_task", "_flag_off_task", "_timeout_close_task",
+        "audio_handler", "connection_handler", "debug_tts_timing", "_tts_burst_total",
+        "ws_gate_drops", "_ws_block_count", "_packet_log_count", "_size_stats", "_size_stats_total",
+        "_drop_stats", "_flood_drop_count", "_dtx_drop_count", "_letter_cooldown_skip_count",
+        "_rx_window", "_last_flood_alert_ms", "_msg_count_1sec", "_total_bytes_1sec",
+        "_ignored_listen_count", "tts_active", "_processing_text", "_mic_ack_event",
+        "_rid_counter", "welcome_msg", "_tts_start_json", "_tts_stop_json",
+        "_tts_stop_cooldown_json", "_session_id_suffix",
+    )
+
+    # セッションに依存しない固定制御メッセージはクラス単位で1回だけシリアライズ
+    _listen_start_json = orjson.dumps({"type": "listen", "state": "start", "mode": "continuous"}).decode()
+    _vad_disable_json = orjson.dumps({"type": "vad_control", "action": "disable", "reason": "ai_speaking_preroll"}).decode()  # VADバイパス（常時送信）
+    _vad_enable_json = orjson.dumps({"type": "vad_control", "action": "enable", "reason": "ai_finished_hangover"}).decode()  # VAD判定復帰
+    _stop_timer_json = orjson.dumps({"type": "stop_timer"}).decode()
+    _power_save_json = orjson.dumps({"type": "power_save", "enabled": True}).decode()  # 既存のSetPowerSaveMode機能を使用
+    # テキスト可変メッセージの固定部分（textのみシリアライズし、末尾に接続単位の _session_id_suffix を連結）
+    _sentence_start_prefix = '{"type":"tts","state":"sentence_start","text":'
+    _stt_prefix = '{"type":"stt","text":'
+
     def __init__(self, websocket: web.WebSocketResponse, headers: Dict[str, str]):
         logger.info(f"🐛 ConnectionHandler.__init__ 開始")
         self.websocket = websocket
@@ -42,18 +153,18 @@ class ConnectionHandler:
         logger.info(f"🐛 device_id設定: {self.device_id}")
         self.client_id = headers.get("client-id") or str(uuid.uuid4())
         self.protocol_version = int(headers.get("protocol-version", "1"))
-        import time as time_module  # スコープエラー回避
-        self.session_id = f"session_{int(time_module.time())}"  # Server2準拠のセッションID
+        # プロトコルは接続時に確定するため、バイナリパーサを一度だけ選択（v2/v3以外はv1扱い）
+        self._parse_binary = {2: self._parse_v2, 3: self._parse_v3}.get(self.protocol_version, self._parse_v1)
+        self.session_id = uuid.uuid4().hex  # 接続単位のセッションID
         
         self.asr_service = ASRService()
         self.tts_service = TTSService()
         self.llm_service = LLMService()
         self.memory_service = MemoryService()
 
-        self.chat_history = deque(maxlen=10) # Store last 10 messages
+        self.chat_history = [] # Store last 10 messages (_append_chat で上限管理)
         self.client_is_speaking = False
         self.stop_event = threading.Event() # For graceful shutdown (server2 style)
-        self.session_id = str(uuid.uuid4())
         self.audio_format = "opus"  # Default format (ESP32 sends Opus like server2)
         
         # レター機能の状態管理
@@ -61,6 +172,14 @@ class ConnectionHandler:
         self.letter_message = None
         self.letter_target_friend = None
         self.letter_suggested_friend = None
+        self.letter_rid = None
+        
+        # 認証・短期記憶（事前ロード or 初回発話時に設定）
+        self.user_id = None
+        self.short_memory_processor = None
+        self.last_alarm_error = None  # アラーム作成失敗の詳細
+        self.timer_process_count = 0
+        self.last_timer_text = None
         
         # 接続時にデバイスを登録
         connected_devices[self.device_id] = self
@@ -71,28 +190,61 @@ class ConnectionHandler:
         self.close_after_chat = False  # Server2準拠: チャット後の接続制御
         
         # Audio buffering (server2 style)
-        self.asr_audio = []  # List of Opus frames (server2 style)
         self.client_have_voice = False
         self.client_voice_stop = False
-        self.last_activity_time = time.time()
+        self.last_activity_time = time.monotonic()
+        self._activity_seq = 0  # 受信フレーム毎に加算（時刻はタイマー発火時に同期）
+        self._activity_seq_seen = 0
         
         # Server2準拠: タイムアウト監視（環境変数で調整可能）
         self.timeout_seconds = Config.WEBSOCKET_TIMEOUT_SECONDS
+        self._timeout_check_interval = self.timeout_seconds / 10  # 活動カウンタの確認間隔（判定誤差は最大この値）
         
         # 🎯 3. ACK + 再送キュー機能
         self.pending_alarms = {}  # {message_id: alarm_data}
         self.alarm_ack_timeouts = {}  # {message_id: timeout_task}
         logger.info(f"🕐 [TIMEOUT_CONFIG] WebSocket timeout set to: {self.timeout_seconds} seconds")
         
-        self.timeout_task = None
+        self.timeout_handle = None  # call_laterのタイムアウトタイマー
+        self._tts_idle = asyncio.Event()  # TTS音声送信中でなければセット
+        self._tts_idle.set()
+        self._tts_task = None  # 再生中のTTS送信タスク（中断はcancelで行う）
+        self._flag_off_task = None  # TTS終了後のクールダウン→フラグOFFタスク（接続毎に最大1つ）
+        self._timeout_close_task = None
         
         # Initialize server2-style audio handler
         self.audio_handler = AudioHandlerServer2(self)
+        # Server2完全準拠: Connection Handler（毎フレームの生成チェックを避けるため接続時に生成）
+        self.connection_handler = Server2StyleConnectionHandler()
+        logger.info("🎯 [CONNECTION_INIT] Server2StyleConnectionHandler initialized")
         # デバッグ用: per-frame Δt ログ出力を制御するフラグ（False: 無効）
         self.debug_tts_timing = False
         # 累積バースト検出カウンタ
         self._tts_burst_total = 0
         
+        # WebSocket入口ガード統計（毎フレームのhasattr判定を避けるため事前初期化）
+        self.ws_gate_drops = 0
+        self._ws_block_count = 0
+        self._packet_log_count = 0
+        self._size_stats = [0, 0, 0, 0]  # _SIZE_* 別の受信フレーム数
+        self._size_stats_total = 0  # サイズ分類済みフレーム総数（ROOT_CAUSE分析用）
+        self._drop_stats = [0, 0, 0, 0]  # _SIZE_* 別の洪水時破棄フレーム数
+        self._flood_drop_count = 0  # 洪水時の緊急破棄フレーム数（ログ間引き用）
+        self._dtx_drop_count = 0
+        self._letter_cooldown_skip_count = 0
+        # 洪水検知用の1秒スライディング窓: (受信時刻ms, サイズ)
+        self._rx_window = deque()
+        self._last_flood_alert_ms = 0
+        self._msg_count_1sec = 0
+        self._total_bytes_1sec = 0
+        self._ignored_listen_count = 0
+        
+        # TTS/テキスト処理の状態フラグ（ホットパスでhasattr判定をしないよう事前初期化）
+        self.tts_active = False
+        self._processing_text = False
+        self._mic_ack_event = asyncio.Event()  # mic_off ACK受信でセット（TTS開始時に待機→クリア）
+        self._rid_counter = 0  # ログ追跡用RIDの接続内連番
+        
         # Welcome message compatible with ESP32 (Server2準拠)
         self.welcome_msg = {
             "type": "hello",
@@ -106,6 +258,17 @@ class ConnectionHandler:
                 "frame_duration": 60  # Server2準拠の60ms
             }
         }
+        
+        # session_id入りの固定制御メッセージは接続単位で事前シリアライズ（毎ターンのシリアライズを回避）
+        self._tts_start_json = orjson.dumps({"type": "tts", "state": "start", "session_id": self.session_id}).decode()
+        self._tts_stop_json = orjson.dumps({"type": "tts", "state": "stop", "session_id": self.session_id}).decode()
+        # cooldown付きTTS停止（通常1200ms / レター中600ms）
+        self._tts_stop_cooldown_json = {
+            ms: orjson.dumps({"type": "tts", "state": "stop", "session_id": self.session_id, "cooldown_ms": ms}).decode()
+            for ms in (600, 1200)
+        }
+        # sentence_start / stt は表示テキストのみ可変: 共通の末尾（session_id）を保持し、textだけをシリアライズ
+        self._session_id_suffix = ',"session_id":' + orjson.dumps(self.session_id).decode() + '}'
 
         logger.info(f"ConnectionHandler initialized for device: {self.device_id}, protocol v{self.protocol_version}")
 
@@ -120,7 +283,7 @@ class ConnectionHandler:
 
     async def handle_text_message(self, message: str):
         try:
-            msg_json = json.loads(message)
+            msg_json = orjson.loads(message)
             msg_type = msg_json.get("type")
             logger.info(f"🔍🔍🔍 DEBUG: Received message type: '{msg_type}' from {self.device_id} 🔍🔍🔍")
 
@@ -158,8 +321,7 @@ class ConnectionHandler:
                 text_input = msg_json.get("text", "")
                 if text_input:
                     logger.info(f"🔥🔥🔥 TTS依頼受信: '{text_input}' from {self.device_id} 🔥🔥🔥")
-                    import uuid
-                    rid = str(uuid.uuid4())[:8]
+                    rid = self._next_rid()
                     
                     # レター通知の場合は応答待ち状態に設定（グローバル状態）
                     if "お手紙が届いている" in text_input and "聞く？後にする？" in text_input:
@@ -182,14 +344,13 @@ class ConnectionHandler:
                 
                 # タイマー完了をユーザーに通知
                 response_text = f"時間だよ！{timer_message}にゃん"
-                import uuid
-                rid = str(uuid.uuid4())[:8]
+                rid = self._next_rid()
                 await self.send_audio_response(response_text, rid)
                 logger.info(f"⏰ タイマー完了通知を送信: {response_text}")
             else:
                 logger.warning(f"Unknown message type from {self.device_id}: {msg_type}")
 
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             logger.error(f"Invalid JSON from {self.device_id}: {message[:100]}...")
         except Exception as e:
             logger.error(f"Error handling text message from {self.device_id}: {e}")
@@ -199,55 +360,58 @@ class ConnectionHandler:
         try:
             # 📊 [DATA_TRACKER] 受信データ完全追跡
             msg_size = len(message)
-            current_time = time.monotonic()
+            # 🎯 [MONOTONIC_TIME] 単一時基統一: フレーム毎の時刻取得は整数msで1回のみ
+            now_ms = time.monotonic_ns() // 1_000_000
 
             # 🛑 [DTX_ABSOLUTE_DROP_EARLY] 1-5ByteのDTXフレームを入口で即座に破棄（サーバ負荷軽減）
             if msg_size <= 5:
-                if not hasattr(self, '_dtx_drop_count'):
-                    self._dtx_drop_count = 0
                 self._dtx_drop_count += 1
                 if self._dtx_drop_count % 50 == 0:
                     logger.info(f"🛑 [DTX_ABSOLUTE_DROP] Early entrance DTX drop: {self._dtx_drop_count} total")
                 return  # 入口で完全破棄
             
-            # 🔍 [FLOOD_DETECTION] 大量送信検知
-            if not hasattr(self, '_last_msg_time'):
-                self._last_msg_time = current_time
-                self._msg_count_1sec = 0
-                self._total_bytes_1sec = 0
+            # 🔍 [FLOOD_DETECTION] 大量送信検知（直近1秒のスライディング窓、整数ms）
+            rx_window = self._rx_window
+            rx_window.append((now_ms, msg_size))
+            self._total_bytes_1sec += msg_size
+            horizon = now_ms - _FLOOD_WINDOW_MS
+            while rx_window[0][0] <= horizon:
+                self._total_bytes_1sec -= rx_window.popleft()[1]
+            self._msg_count_1sec = msg_count = len(rx_window)
+            
+            # 🚨 [IMMEDIATE_FLOOD] リアルタイム洪水警告 + 緊急遮断（パース・統計・ログより前に破棄）
+            if msg_count > _FLOOD_DROP_FRAMES:
+                # 緊急遮断: 高頻度フレームを強制破棄（ESP32ファームウェア未更新対策）
+                self._flood_drop_count += 1
+                
+                # 洪水中は毎フレーム出すとログ自体が負荷になるため30フレームに1回（分類・文字列もこの時のみ生成）
+                if self._flood_drop_count % 30 == 1:
+                    # 🔍 [DROP_ANALYSIS] 破棄理由分析（ログ対象フレームのサンプル）
+                    size_category = _size_category(msg_size)
+                    self._drop_stats[size_category] += 1
+                    avg_size = self._total_bytes_1sec / msg_count
+                    logger.error(f"🚨 [CRITICAL_FLOOD] ESP32からの異常大量送信: {msg_count}フレーム/秒, {self._total_bytes_1sec}bytes/秒 (平均{avg_size:.1f}B/フレーム) → WebSocket切断リスク")
+                    logger.error(f"🛑 [EMERGENCY_DROP] 緊急フレーム破棄: {_SIZE_CATEGORY_NAMES[size_category]}({msg_size}B) → 接続保護のため破棄 (累計{self._flood_drop_count})")
+                    logger.error(f"🔍 [DROP_STATS] 破棄統計(サンプル): DTX={self._drop_stats[_SIZE_DTX]} NORMAL={self._drop_stats[_SIZE_NORMAL]} SMALL={self._drop_stats[_SIZE_SMALL]}")
+                
+                return  # 強制破棄して接続を保護
             
-            time_diff = current_time - self._last_msg_time
-            if time_diff < 1.0:  # 1秒以内
-                self._msg_count_1sec += 1
-                self._total_bytes_1sec += msg_size
-            else:
-                # 1秒経過: 統計リセット
-                if self._msg_count_1sec > 20:  # 1秒に20フレーム以上
-                    logger.warning(f"🚨 [FLOOD_ALERT] ESP32大量送信検知: {self._msg_count_1sec}フレーム/秒, {self._total_bytes_1sec}bytes/秒")
-                self._last_msg_time = current_time
-                self._msg_count_1sec = 1
-                self._total_bytes_1sec = msg_size
+            if msg_count > _FLOOD_ALERT_FRAMES and now_ms - self._last_flood_alert_ms >= _FLOOD_WINDOW_MS:
+                self._last_flood_alert_ms = now_ms
+                logger.warning(f"🚨 [FLOOD_ALERT] ESP32大量送信検知: {msg_count}フレーム/秒, {self._total_bytes_1sec}bytes/秒")
             
             # 📈 [SIZE_HISTOGRAM] サイズ別分類
-            if msg_size == 1:
-                size_category = "DTX"
-            elif msg_size < 50:
-                size_category = "SMALL"
-            elif msg_size < 150:
-                size_category = "NORMAL"
-            else:
-                size_category = "LARGE"
+            size_category = _size_category(msg_size)
             
             # 🔍 [SOURCE_TRACE] 送信元プログラム推定
-            if not hasattr(self, '_size_stats'):
-                self._size_stats = {"DTX": 0, "SMALL": 0, "NORMAL": 0, "LARGE": 0}
             self._size_stats[size_category] += 1
             
-            # 🎯 [ROOT_CAUSE] 根本原因推定ログ
-            total_frames = sum(self._size_stats.values())
-            if total_frames % 50 == 0:  # 50フレーム毎に分析
-                dtx_ratio = self._size_stats["DTX"] / total_frames * 100
-                normal_ratio = self._size_stats["NORMAL"] / total_frames * 100
+            # 🎯 [ROOT_CAUSE] 根本原因推定ログ（総数はカウンタで保持し、毎フレームの集計をしない）
+            self._size_stats_total += 1
+            total_frames = self._size_stats_total
+            if total_frames % 50 == 0:  # 50フレーム毎に分析（比率・文字列はこの時のみ計算）
+                dtx_ratio = self._size_stats[_SIZE_DTX] / total_frames * 100
+                normal_ratio = self._size_stats[_SIZE_NORMAL] / total_frames * 100
                 logger.info(f"🔍 [ROOT_CAUSE] フレーム構成分析: DTX={dtx_ratio:.1f}% NORMAL={normal_ratio:.1f}% (total={total_frames})")
                 
                 # 根本原因推定
@@ -259,115 +423,60 @@ class ConnectionHandler:
                     logger.warning(f"🎯 [CAUSE_MIXED] 混合送信: マイク制御異常の可能性")
             
             # A. 入口で落とす（最重要）- AI発話中+クールダウン中完全ブロック
-            # 🎯 [MONOTONIC_TIME] 単一時基統一: monotonic使用でシステム時刻変更に耐性
-            now_ms = time.monotonic() * 1000
-            is_ai_speaking = hasattr(self, 'audio_handler') and getattr(self.audio_handler, 'client_is_speaking', False)
-            is_cooldown = hasattr(self, 'audio_handler') and now_ms < getattr(self.audio_handler, 'tts_cooldown_until', 0)
-            
-            # レター機能中はクールダウンをスキップして音声データを通す
-            is_letter_active = self.letter_state != "none"
-            should_block = (is_ai_speaking or (is_cooldown and not is_letter_active))
-            
-            if should_block:
-                # B. WebSocket入口で必ず落とす（最重要）
-                # 同一の時基でガード（ユーザー指摘の通り）
-                if not hasattr(self, 'ws_gate_drops'):
-                    self.ws_gate_drops = 0
-                if not hasattr(self, '_ws_block_count'):
-                    self._ws_block_count = 0
-                    
-                self.ws_gate_drops += 1
-                self._ws_block_count += 1
-                
-                # 統計・デバッグ情報
-                block_reason = "AI発話中" if is_ai_speaking else f"クールダウン中(残り{int(getattr(self.audio_handler, 'tts_cooldown_until', 0) - now_ms)}ms)"
-                
-                # ログは30フレームに1回（詳細確認のため頻度上げ）
-                if self._ws_block_count % 30 == 0:
-                    logger.info(f"🚪 [WS_ENTRANCE_BLOCK] {block_reason}入口ブロック: {size_category}({msg_size}B) 過去30フレーム完全破棄 (累計={self.ws_gate_drops})")
-                return  # 即座に破棄
-            
-            # レター機能中でクールダウンをスキップした場合のログ
-            if is_cooldown and is_letter_active:
-                if not hasattr(self, '_letter_cooldown_skip_count'):
-                    self._letter_cooldown_skip_count = 0
+            # gate_until_ms はAI発話中は無限大、それ以外はクールダウン終了時刻（audio_handler側で更新）
+            audio_handler = self.audio_handler
+            if now_ms < audio_handler.gate_until_ms:
+                # レター機能中はクールダウンをスキップして音声データを通す（AI発話中は常にブロック）
+                if audio_handler.client_is_speaking or self.letter_state == "none":
+                    # B. WebSocket入口で必ず落とす（最重要）
+                    # 同一の時基でガード（ユーザー指摘の通り）
+                    self.ws_gate_drops += 1
+                    self._ws_block_count += 1
+                    
+                    # ログは30フレームに1回（詳細確認のため頻度上げ）: 理由文字列もログ時のみ生成
+                    if self._ws_block_count % 30 == 0:
+                        block_reason = "AI発話中" if audio_handler.client_is_speaking else f"クールダウン中(残り{audio_handler.tts_cooldown_until - now_ms}ms)"
+                        logger.info(f"🚪 [WS_ENTRANCE_BLOCK] {block_reason}入口ブロック: {_SIZE_CATEGORY_NAMES[size_category]}({msg_size}B) 過去30フレーム完全破棄 (累計={self.ws_gate_drops})")
+                    return  # 即座に破棄
+                
+                # レター機能中でクールダウンをスキップした場合のログ
                 self._letter_cooldown_skip_count += 1
                 if self._letter_cooldown_skip_count % 10 == 0:
                     logger.info(f"📮 [LETTER_COOLDOWN_SKIP] レター機能中のクールダウンスキップ: {self._letter_cooldown_skip_count}回")
             
-            # Server2準拠: 小パケットでも活動時間を更新（ESP32からの継続通信を認識）
-            self.last_activity_time = time.time()
+            # Server2準拠: 小パケットでも活動を記録（ESP32からの継続通信を認識）
+            # 時刻取得・タイマー再設定は行わず、タイマー発火時にカウンタ変化を見て延長する
+            self._activity_seq += 1
             
             # 📊 [TRAFFIC_LOG] 送信データ詳細ログ（★入口ガード通過★ - AI非発話＆クールダウン外）
-            if not hasattr(self, '_packet_log_count'):
-                self._packet_log_count = 0
             self._packet_log_count += 1
             
             # (DTX は入口で既に破棄済み)
             
-            # 🚨 [ESP32_DEBUG] ESP32修正後のフレーム詳細分析
-            logger.info(f"📊 [FRAME_DETAIL] ★Server受信★ {size_category}({msg_size}B) hex={message[:min(8, len(message))].hex()} count/sec={self._msg_count_1sec} bytes/sec={self._total_bytes_1sec} protocol=v{self.protocol_version}")
-            
-            # 通常時も10フレームに1回に制限（より詳細に）
+            # 通常時も10フレームに1回に制限（先頭hexもこのタイミングでのみ生成）
             if self._packet_log_count % 10 == 0:
-                logger.info(f"📊 [TRAFFIC_DETAIL] ★入口ガード通過★ {size_category}({msg_size}B) count/sec={self._msg_count_1sec} bytes/sec={self._total_bytes_1sec} protocol=v{self.protocol_version}")
-            
-            # 🚨 [IMMEDIATE_FLOOD] リアルタイム洪水警告 + 緊急遮断
-            if self._msg_count_1sec > 30:  # 30フレーム/秒超過時の緊急対策
-                avg_size = self._total_bytes_1sec / self._msg_count_1sec if self._msg_count_1sec > 0 else 0
-                logger.error(f"🚨 [CRITICAL_FLOOD] ESP32からの異常大量送信: {self._msg_count_1sec}フレーム/秒, {self._total_bytes_1sec}bytes/秒 (平均{avg_size:.1f}B/フレーム) → WebSocket切断リスク")
-                
-                # 🔍 [DEBUG_THRESHOLD] 閾値デバッグ
-                logger.error(f"🔍 [THRESHOLD_DEBUG] 現在: {self._msg_count_1sec}フレーム/秒, 閾値: 25フレーム/秒, 超過: {self._msg_count_1sec > 25}")
-                
-                # 緊急遮断: 高頻度フレームを強制破棄
-                if self._msg_count_1sec > 10:  # 10フレーム/秒超過で強制破棄（ESP32ファームウェア未更新対策）
-                    logger.error(f"🛑 [EMERGENCY_DROP] 緊急フレーム破棄: {self._msg_count_1sec}フレーム/秒, {size_category}({msg_size}B) → 接続保護のため破棄")
-                    
-                    # 🔍 [DROP_ANALYSIS] 破棄理由分析
-                    if not hasattr(self, '_drop_stats'):
-                        self._drop_stats = {"DTX": 0, "SMALL": 0, "NORMAL": 0, "LARGE": 0}
-                    self._drop_stats[size_category] += 1
-                    logger.error(f"🔍 [DROP_STATS] 破棄統計: DTX={self._drop_stats['DTX']} NORMAL={self._drop_stats['NORMAL']} SMALL={self._drop_stats['SMALL']}")
-                    
-                    return  # 強制破棄して接続を保護
-                else:
-                    logger.error(f"🔍 [NO_DROP] 破棄条件未満: {self._msg_count_1sec}フレーム/秒 <= 10 → 処理継続")
+                # メッセージ整形・hex化は出力するシンクがある時のみ（loguruの{}引数）
+                logger.info(
+                    "📊 [TRAFFIC_DETAIL] ★入口ガード通過★ {}({}B) hex={} count/sec={} bytes/sec={} protocol=v{}",
+                    _SIZE_CATEGORY_NAMES[size_category], msg_size, _LazyHex(message),
+                    self._msg_count_1sec, self._total_bytes_1sec, self.protocol_version,
+                )
             
             # 旧来の小パケットスキップを一時無効化（Server2 Connection Handlerで処理）
             # if len(message) <= 12:  # Skip very small packets (DTX/keepalive) but keep activity alive
             #     logger.info(f"⏭️ [DEBUG] Skipping small packet: {len(message)} bytes (activity updated)")
             #     return
                 
-            if self.protocol_version == 2:
-                # Protocol v2: version(2) + type(2) + reserved(2) + timestamp(4) + payload_size(4) + payload
-                if len(message) < 14:
-                    return
-                version, msg_type, reserved, timestamp, payload_size = struct.unpack('>HHHII', message[:14])
-                audio_data = message[14:14+payload_size]
-            elif self.protocol_version == 3:
-                # Protocol v3: type(1) + reserved(1) + payload_size(2) + payload
-                if len(message) < 4:
-                    return
-                msg_type, reserved, payload_size = struct.unpack('>BBH', message[:4])
-                audio_data = message[4:4+payload_size]
-                # logger.info(f"📋 [PROTO] v3: type={msg_type}, payload_size={payload_size}, extracted_audio={len(audio_data)} bytes")  # ログ削減
-            else:
-                # Protocol v1: raw audio data
-                audio_data = message
+            # 接続時に確定したプロトコル別パーサでペイロード抽出
+            audio_data = self._parse_binary(message)
+            if audio_data is None:
+                return
 
-            # Server2完全準拠: Connection Handlerを使用（全プロトコル共通）
-            if not hasattr(self, 'connection_handler'):
-                from core_connection_server2 import Server2StyleConnectionHandler
-                self.connection_handler = Server2StyleConnectionHandler()
-                logger.info("🎯 [CONNECTION_INIT] Server2StyleConnectionHandler initialized")
-                
-            # Server2準拠のメッセージルーティング
+            # Server2準拠のメッセージルーティング（Connection Handlerは全プロトコル共通）
             try:
                 await self.connection_handler.route_message(audio_data, self.audio_handler)
             except Exception as route_error:
                 logger.error(f"🚨S2🚨 ★TEST★ [ROUTE_ERROR] route_message failed: {route_error}")
-                import traceback
                 logger.error(f"🚨S2🚨 ★TEST★ [ROUTE_ERROR] Traceback: {traceback.format_exc()}")
                 # フォールバック: 直接audio_handlerを呼び出し
                 await self.audio_handler.handle_audio_frame(audio_data)
@@ -375,13 +484,51 @@ class ConnectionHandler:
             # 注意: 活動時間更新は既にメソッド冒頭で実行済み
             
         except Exception as e:
-            logger.error(f"🚨 [CRITICAL_ERROR] Binary message processing failed for {self.device_id}: {e}")
-            logger.error(f"🚨 [CRITICAL_ERROR] Message details: len={len(message)}, protocol_v={self.protocol_version}")
-            logger.error(f"🚨 [CRITICAL_ERROR] Message hex: {message.hex() if len(message) <= 100 else message[:100].hex()}")
-            import traceback
-            logger.error(f"🚨 [CRITICAL_ERROR] Full traceback: {traceback.format_exc()}")
-            # Continue processing despite error to avoid connection drop
-            raise  # Re-raise to trigger WebSocket disconnect investigation
+            # hex・traceback整形はシンクが受け付けた時のみ（loguruが例外情報を付与、hexは_LazyHexで遅延）
+            logger.opt(exception=e).error(
+                "🚨 [CRITICAL_ERROR] Binary message processing failed for {}: {} len={} protocol_v={} hex={}",
+                self.device_id, e, len(message), self.protocol_version, _LazyHex(message, 100),
+            )
+            # 接続レベルの異常のみ切断へ伝播、フレーム単位の失敗は破棄して受信継続
+            if isinstance(e, (ConnectionError, ConnectionClosedError)):
+                raise
+
+    def _parse_v1(self, message: bytes):
+        """Protocol v1: raw audio data"""
+        return message
+
+    def _parse_v2(self, message: bytes):
+        """Protocol v2: version(2) + type(2) + reserved(2) + timestamp(4) + payload_size(4) + payload"""
+        if len(message) < _V2_HEADER.size:
+            return None
+        version, msg_type, reserved, timestamp, payload_size = _V2_HEADER.unpack_from(message, 0)
+        start = _V2_HEADER.size
+        return memoryview(message)[start:start + payload_size]  # ペイロードはコピーせず参照渡し
+
+    def _parse_v3(self, message: bytes):
+        """Protocol v3: type(1) + reserved(1) + payload_size(2) + payload"""
+        if len(message) < _V3_HEADER.size:
+            return None
+        msg_type, reserved, payload_size = _V3_HEADER.unpack_from(message, 0)
+        start = _V3_HEADER.size
+        return memoryview(message)[start:start + payload_size]  # ペイロードはコピーせず参照渡し
+
+    def _next_rid(self) -> str:
+        """ログ追跡用RIDを採番（端末ID末尾4文字 + 接続内連番）"""
+        self._rid_counter += 1
+        return f"{self.device_id[-4:]}-{self._rid_counter:04x}"
+
+    def _append_chat(self, role: str, content: str):
+        """会話履歴に追加（直近10件を保持、リストをその場で更新）"""
+        self.chat_history.append({"role": role, "content": content})
+        if len(self.chat_history) > 10:
+            del self.chat_history[0]
+
+    async def _send_control_batch(self, *payloads: str):
+        """制御JSONを順番に送信（ESP32は1テキストフレーム=1 JSON、送信中の音声フレームを追い越さないようsend_strで直列に）"""
+        send_str = self.websocket.send_str
+        for payload in payloads:
+            await send_str(payload)
 
     async def handle_hello_message(self, msg_json: Dict[str, Any]):
         """Handle ESP32 hello message"""
@@ -401,16 +548,18 @@ class ConnectionHandler:
             logger.info(f"Client features: {features}")
             
         # Send welcome response
-        if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
+        if _ws_dead(self.websocket):
             logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send welcome message - connection dead")
             return
-        await self.websocket.send_str(json.dumps(self.welcome_msg))
-        logger.info(f"✅ [HELLO_RESPONSE] Sent welcome message to {self.device_id}: {self.welcome_msg}")
+        # audio_params反映後に1回だけシリアライズし、送信とログで共用
+        welcome_json = orjson.dumps(self.welcome_msg).decode()
+        await self.websocket.send_str(welcome_json)
+        logger.info(f"✅ [HELLO_RESPONSE] Sent welcome message to {self.device_id}: {welcome_json}")
         logger.info(f"🤝 [HANDSHAKE] WebSocket handshake completed successfully for {self.device_id}")
         
-        # Server2準拠: タイムアウト監視タスク起動
-        self.timeout_task = asyncio.create_task(self._check_timeout())
-        logger.info(f"Started timeout monitoring task for {self.device_id}")
+        # Server2準拠: タイムアウト監視タイマー起動
+        self._arm_timeout(self._timeout_check_interval)
+        logger.info(f"Started timeout monitoring timer for {self.device_id}")
         
         # 🚀 認証+短期記憶+辞書キャッシュを事前ロード（リスニング前に完了）
         await self._preload_auth_and_memory()
@@ -427,13 +576,11 @@ class ConnectionHandler:
         if state == "start":
             # 3) 「listen:start」も無視（TTS中/クールダウン中）
             # 🎯 [MONOTONIC_TIME] 単一時基統一
-            now_ms = time.monotonic() * 1000
-            is_ai_speaking = hasattr(self, 'audio_handler') and getattr(self.audio_handler, 'client_is_speaking', False)
-            is_cooldown = hasattr(self, 'audio_handler') and now_ms < getattr(self.audio_handler, 'tts_cooldown_until', 0)
+            now_ms = time.monotonic_ns() // 1_000_000
+            is_ai_speaking = self.audio_handler.client_is_speaking
+            is_cooldown = now_ms < self.audio_handler.tts_cooldown_until
             
             if is_ai_speaking or is_cooldown:
-                if not hasattr(self, '_ignored_listen_count'):
-                    self._ignored_listen_count = 0
                 self._ignored_listen_count += 1
                 
                 block_reason = "AI発話中" if is_ai_speaking else f"クールダウン中"
@@ -442,21 +589,10 @@ class ConnectionHandler:
             
             # Server2準拠: listen start時の完全バッファクリア
             logger.info(f"🧹 [LISTEN_START_CLEAR] Listen開始: バッファ完全クリア実行")
-            if hasattr(self, 'audio_handler'):
-                # ASRバッファクリア
-                if hasattr(self.audio_handler, 'audio_frames'):
-                    cleared_frames = len(self.audio_handler.audio_frames)
-                    self.audio_handler.audio_frames.clear()
-                    if cleared_frames > 0:
-                        logger.info(f"🧹 [LISTEN_ASR_CLEAR] Listen開始時ASRバッファクリア: {cleared_frames}フレーム")
-                
-                # VAD状態リセット
-                if hasattr(self.audio_handler, 'silence_count'):
-                    self.audio_handler.silence_count = 0
-                if hasattr(self.audio_handler, 'last_voice_time'):
-                    self.audio_handler.last_voice_time = 0
-                if hasattr(self.audio_handler, 'wake_until'):
-                    self.audio_handler.wake_until = 0
+            # ASRバッファクリア + VAD状態リセット
+            cleared_frames = self.audio_handler.reset_listen_state()
+            if cleared_frames > 0:
+                logger.info(f"🧹 [LISTEN_ASR_CLEAR] Listen開始時ASRバッファクリア: {cleared_frames}フレーム")
                     
             logger.info(f"Client {self.device_id} started listening")
 
@@ -468,7 +604,7 @@ class ConnectionHandler:
         logger.info(f"🔍 [ACK_DEBUG] Received ACK: original_type={original_type}, action={action}, full_json={msg_json}")
         
         if original_type == "audio_control" and action == "mic_off":
-            self._mic_ack_received = True
+            self._mic_ack_event.set()
             logger.info(f"✅ [ACK_RECEIVED] ESP32 confirmed mic_off: {msg_json}")
         elif original_type == "audio_control" and action == "mic_on":
             logger.info(f"✅ [ACK_RECEIVED] ESP32 confirmed mic_on: {msg_json}")
@@ -483,126 +619,23 @@ class ConnectionHandler:
             logger.info(f"✅ [ACK_RECEIVED] Unknown ACK: {msg_json}")
 
 
-    async def process_accumulated_audio(self):
-        """Process accumulated voice audio data"""
-        try:
-            logger.info(f"🎯 [AUDIO_START] ===== Processing accumulated audio: {len(self.audio_buffer)} bytes =====")
-            
-            # Convert Opus to WAV using server2 method
-            logger.info(f"🔍 [ASR] Audio format: {self.audio_format}, buffer size: {len(self.audio_buffer)}")
-            
-            if self.audio_format == "opus":
-                logger.info(f"🔄 [WEBSOCKET] Processing as Opus format")
-                # Convert Opus to WAV using server2 method
-                try:
-                    import wave
-                    import opuslib_next
-                    
-                    logger.info(f"🔄 [WEBSOCKET] Converting Opus buffer to WAV (server2 method)")
-                    
-                    # For debugging: save original data
-                    logger.info(f"🔍 [OPUS_DEBUG] ===== First 20 bytes: {bytes(self.audio_buffer[:20]).hex()} =====")
-                    
-                    # Method 1: Try as single packet
-                    try:
-                        decoder = opuslib_next.Decoder(16000, 1)  # 16kHz, mono
-                        pcm_data = decoder.decode(bytes(self.audio_buffer), 960)  # 60ms frame
-                        logger.info(f"✅ [WEBSOCKET] Single packet decode success: {len(pcm_data)} bytes PCM")
-                    except Exception as e1:
-                        logger.warning(f"⚠️ [WEBSOCKET] Single packet failed: {e1}")
-                        
-                        # Method 2: Just try as raw PCM data instead of Opus
-                        logger.warning(f"⚠️ [WEBSOCKET] Trying as raw PCM data instead")
-                        # Assume it's already PCM 16-bit mono at 16kHz
-                        pcm_data = bytes(self.audio_buffer)
-                        logger.info(f"✅ [WEBSOCKET] Using raw data as PCM: {len(pcm_data)} bytes")
-                    
-                    # Create WAV file from PCM
-                    wav_buffer = io.BytesIO()
-                    with wave.open(wav_buffer, 'wb') as wav_file:
-                        wav_file.setnchannels(1)  # mono
-                        wav_file.setsampwidth(2)  # 16-bit
-                        wav_file.setframerate(16000)  # 16kHz
-                        wav_file.writeframes(pcm_data)
-                    
-                    wav_buffer.seek(0)
-                    audio_file = wav_buffer
-                    audio_file.name = "audio.wav"
-                    logger.info(f"🎉 [WEBSOCKET] Converted Opus to WAV: {len(self.audio_buffer)} -> {len(pcm_data)} bytes PCM")
-                    
-                except Exception as e:
-                    logger.error(f"❌ [WEBSOCKET] Opus conversion failed: {e}")
-                    # Fallback: Create empty WAV (better than Opus for OpenAI)
-                    wav_buffer = io.BytesIO()
-                    with wave.open(wav_buffer, 'wb') as wav_file:
-                        wav_file.setnchannels(1)
-                        wav_file.setsampwidth(2) 
-                        wav_file.setframerate(16000)
-                        wav_file.writeframes(b'\x00' * 1600)  # 100ms of silence
-                    wav_buffer.seek(0)
-                    audio_file = wav_buffer
-                    audio_file.name = "audio.wav"
-                    logger.info(f"⚠️ [WEBSOCKET] Fallback: sending silent WAV")
-            else:
-                # Process as PCM data (ESP32 default)
-                logger.info(f"🔄 [WEBSOCKET] Processing as PCM format")
-                try:
-                    import wave
-                    
-                    # Create WAV file from raw PCM data
-                    wav_buffer = io.BytesIO()
-                    with wave.open(wav_buffer, 'wb') as wav_file:
-                        wav_file.setnchannels(1)  # mono
-                        wav_file.setsampwidth(2)  # 16-bit
-                        wav_file.setframerate(16000)  # 16kHz
-                        wav_file.writeframes(bytes(self.audio_buffer))
-                    
-                    wav_buffer.seek(0)
-                    audio_file = wav_buffer
-                    audio_file.name = "audio.wav"
-                    logger.info(f"✅ [WEBSOCKET] Created WAV from PCM: {len(self.audio_buffer)} bytes")
-                    
-                except Exception as e:
-                    logger.error(f"❌ [WEBSOCKET] PCM to WAV conversion failed: {e}")
-                    # Fallback: raw data
-                    audio_file = io.BytesIO(bytes(self.audio_buffer))
-                    audio_file.name = "audio.wav"
-            
-            # Convert audio to text using ASR
-            logger.info(f"🎤 [ASR_START] ===== Calling OpenAI Whisper API =====")
-            transcribed_text = await self.asr_service.transcribe(audio_file)
-            logger.info(f"📝 [ASR_RESULT] ===== ASR Result: '{transcribed_text}' (length: {len(transcribed_text) if transcribed_text else 0}) =====")
-            
-            if transcribed_text and transcribed_text.strip():
-                logger.info(f"✅ [ASR] Processing transcription: {transcribed_text}")
-                await self.process_text(transcribed_text)
-            else:
-                logger.warning(f"❌ [ASR] No valid result for {self.device_id}")
-                
-        except Exception as e:
-            logger.error(f"❌ [AUDIO_ERROR] ===== Error processing accumulated audio from {self.device_id}: {e} =====")
-
-
     async def process_text(self, text: str, rid: str = None):
         """Process text input through LLM and generate response"""
         try:
             if not rid:
-                import uuid
-                rid = str(uuid.uuid4())[:8]
+                rid = self._next_rid()
             
             # 🎯 検索可能ログ: START_TO_CHAT
-            logger.info(f"🔥 RID[{rid}] START_TO_CHAT: '{text}' (tts_active={getattr(self, 'tts_active', False)})")
+            logger.info(f"🔥 RID[{rid}] START_TO_CHAT: '{text}' (tts_active={self.tts_active})")
 
             # メッセージ確認コマンドチェック
-            if any(keyword in text for keyword in ["メッセージ来てる", "メッセージ来てる？", "お手紙来てる", "お手紙来てる？", "新着", "新着メッセージ"]):
+            if _MESSAGE_CHECK_RE.search(text):
                 logger.info(f"📮 RID[{rid}] メッセージ確認要求: '{text}'")
                 await self.check_new_messages_manual(rid)
                 return
 
             # 特定の友達からのメッセージ確認コマンドチェック
-            import re
-            friend_message_pattern = r'(.+?)からの?(メッセージ|お手紙).*?(なに|何|ある|来てる)'
-            match = re.search(friend_message_pattern, text)
+            match = _FRIEND_MESSAGE_RE.search(text)
             if match:
                 friend_name = match.group(1).strip()
                 logger.info(f"📮 RID[{rid}] 特定友達メッセージ確認要求: '{friend_name}' from '{text}'")
@@ -617,20 +650,19 @@ class ConnectionHandler:
                 return
 
             # TTS中は新しいテキスト処理を拒否
-            if hasattr(self, 'tts_active') and self.tts_active:
+            if self.tts_active:
                 logger.warning(f"🔥 RID[{rid}] START_TO_CHAT_BLOCKED: TTS中のため拒否")
                 return
 
             # 重複実行防止
-            if hasattr(self, '_processing_text') and self._processing_text:
+            if self._processing_text:
                 logger.warning(f"🔥 RID[{rid}] START_TO_CHAT_DUPLICATE: 既に処理中のため拒否")
                 return
 
             self._processing_text = True
             
             # アクティブTTS RIDをセット（後でAbort判定に使用）
-            if hasattr(self.audio_handler, 'active_tts_rid'):
-                self.audio_handler.active_tts_rid = rid
+            self.audio_handler.active_tts_rid = rid
             
             logger.info(f"🔥 RID[{rid}] LLM_START: Processing '{text}'")
             
@@ -651,10 +683,10 @@ class ConnectionHandler:
                 self._processing_text = False
                 return
             
-            self.chat_history.append({"role": "user", "content": text})
+            self._append_chat("user", text)
 
             # Check for alarm-related keywords first (highest priority)
-            if any(keyword in text for keyword in ["起こして", "アラーム", "目覚まし", "時に鳴らして"]):
+            if _ALARM_SET_RE.search(text):
                 logger.info(f"⏰ [ALARM_TRIGGER] Alarm request detected: '{text}'")
                 
                 # 🎯 シンプル確実: アラーム設定のみ、AI応答なし
@@ -662,13 +694,13 @@ class ConnectionHandler:
                 return
             
             # Check for alarm stop keywords
-            elif any(keyword in text for keyword in ["アラーム止めて", "止めて", "アラーム停止", "もういい", "起きた"]):
+            elif _ALARM_STOP_RE.search(text):
                 logger.info(f"⏰ [ALARM_STOP] Alarm stop request detected: '{text}'")
                 await self.send_audio_response("はい、アラームを止めましたにゃん！おはようございます！", rid)
                 return
             
             # Check for sleep/wait mode keywords
-            elif any(keyword in text for keyword in ["バイバイ", "ばいばい", "さようなら", "おやすみ", "待機して", "待機モード", "スリープ"]):
+            elif _SLEEP_MODE_RE.search(text):
                 logger.info(f"😴 [SLEEP_MODE] Sleep mode request detected: '{text}'")
                 logger.info(f"😴 [SLEEP_MODE] キーワード検出成功、send_sleep_command呼び出し開始")
                 # 待機モードコマンドを先に送信
@@ -682,13 +714,12 @@ class ConnectionHandler:
             logger.info(f"🧠 [MEMORY_CHECK] Checking text for memory keywords: '{text}'")
             
             # 先に呼び出しキーワードをチェック（優先度高）
-            if ("覚えてる" in text or "記憶ある" in text or "教えて" in text or 
-                "何が好き" in text or "誕生日はいつ" in text or "知ってる" in text or "記憶してる" in text):
+            if _MEMORY_QUERY_RE.search(text):
                 memory_query = text
                 logger.info(f"🧠 [MEMORY_QUERY_TRIGGER] Memory query triggered! Query: '{text}'")
-            elif "覚えて" in text or "覚えといて" in text or "記憶して" in text or "おぼえて" in text or "おぼえといて" in text:
+            elif _MEMORY_SAVE_RE.search(text):
                 # Extract what to remember
-                memory_to_save = text.replace("覚えて", "").replace("覚えといて", "").replace("記憶して", "").replace("おぼえて", "").replace("おぼえといて", "").strip()
+                memory_to_save = _MEMORY_SAVE_RE.sub("", text).strip()
                 logger.info(f"🧠 [MEMORY_TRIGGER] Memory save triggered! Content: '{memory_to_save}'")
                 
                 if memory_to_save:
@@ -716,20 +747,20 @@ class ConnectionHandler:
                 from utils.short_memory_processor import ShortMemoryProcessor
                 
                 # 事前ロードが完了しているかチェック
-                if not hasattr(self, 'short_memory_processor') or not hasattr(self, 'user_id'):
+                if self.short_memory_processor is None or self.user_id is None:
                     logger.warning(f"🚀 [PRELOAD] Preload not completed, running inline auth")
                     # フォールバック: 事前ロードが完了していない場合は認証実行
                     try:
                         jwt_token, user_id = await self.memory_service._get_valid_jwt_and_user(self.device_id)
                         if jwt_token and user_id:
                             self.user_id = user_id
-                            if not hasattr(self, 'short_memory_processor'):
+                            if self.short_memory_processor is None:
                                 self.short_memory_processor = ShortMemoryProcessor(user_id)
                             self.short_memory_processor.jwt_token = jwt_token
                             self.short_memory_processor.user_id = user_id
                             
                             # LLMServiceのプロセッサーも設定
-                            if hasattr(self, 'llm_service') and self.llm_service:
+                            if self.llm_service:
                                 if not self.llm_service.short_memory_processor:
                                     self.llm_service.set_user_id(user_id)
                                 if self.llm_service.short_memory_processor:
@@ -738,7 +769,7 @@ class ConnectionHandler:
                     except Exception as e:
                         logger.error(f"🚀 [PRELOAD] Fallback auth failed: {e}")
                         # 認証失敗時でも短期記憶プロセッサを初期化（デフォルト値で）
-                        if not hasattr(self, 'short_memory_processor'):
+                        if self.short_memory_processor is None:
                             self.short_memory_processor = ShortMemoryProcessor(self.device_id)
                             logger.warning(f"🚀 [PRELOAD] Short memory processor initialized with device_id as fallback")
                         user_id = self.device_id
@@ -765,7 +796,7 @@ class ConnectionHandler:
                 logger.error(f"🧠 [SHORT_MEMORY] Short memory processing error: {e}")
 
             # Prepare messages for LLM
-            llm_messages = list(self.chat_history)
+            llm_messages = self.chat_history  # 記憶検索結果を付ける場合のみ新しいリストを作る
             if memory_query:
                 logger.info(f"🔍 [MEMORY_SEARCH] Starting memory search for query: '{memory_query}'")
                 
@@ -781,19 +812,19 @@ class ConnectionHandler:
                     retrieved_memory = await self.memory_service.query_memory_with_auth(jwt_token, user_id, memory_query, self.device_id)
                 if retrieved_memory:
                     # 既存メモリ検索結果をユーザーメッセージとして追加（システムプロンプトとの競合を回避）
-                    llm_messages.append({"role": "user", "content": f"[記憶検索結果] {retrieved_memory}"})
+                    llm_messages = [*self.chat_history, {"role": "user", "content": f"[記憶検索結果] {retrieved_memory}"}]
                     logger.info(f"✅ [MEMORY_FOUND] Retrieved memory for LLM: {retrieved_memory[:50]}...")
                 else:
                     logger.info(f"❌ [MEMORY_NOT_FOUND] No memory found for query: '{memory_query}'")
 
             # Generate LLM response (server2 style - no extra keepalive)
             # ユーザーIDを取得してLLMサービスに渡す
-            user_id = getattr(self, 'user_id', None)
+            user_id = self.user_id
             llm_response = await self.llm_service.chat_completion(llm_messages, user_id=user_id)
             
             if llm_response and llm_response.strip():
                 logger.info(f"🔥 RID[{rid}] LLM_RESULT: '{llm_response}'")
-                self.chat_history.append({"role": "assistant", "content": llm_response})
+                self._append_chat("assistant", llm_response)
                 
                 # STT message already sent at ASR completion for fast display
                 # (LLM完了後の重複送信を避けるためコメントアウト)
@@ -812,56 +843,43 @@ class ConnectionHandler:
     async def handle_abort_message(self, rid: str, source: str = "unknown"):
         """Server2のhandleAbortMessage相当処理 - RID追跡対応"""
         try:
-            logger.warning(f"🔥 RID[{rid}] HANDLE_ABORT_MESSAGE: source={source}, active_tts_rid={getattr(self.audio_handler, 'active_tts_rid', 'None')}")
+            logger.warning(f"🔥 RID[{rid}] HANDLE_ABORT_MESSAGE: source={source}, active_tts_rid={self.audio_handler.active_tts_rid}")
             
             # TTS停止状態設定
             self.tts_active = False
             self._processing_text = False
             
+            # 送信中のTTSタスクを中断（送信ループはCancelledErrorで抜け、finallyで後処理）
+            tts_task = self._tts_task
+            if tts_task is not None and not tts_task.done():
+                tts_task.cancel()
+            
             # Server2準拠: Abort時もマイク制御リセット
-            if hasattr(self, 'audio_handler'):
-                self.audio_handler.client_is_speaking = False
-                logger.info(f"🎤 [MIC_CONTROL] Abort時AI発話停止: client_is_speaking=False")
+            self.audio_handler.client_is_speaking = False
+            logger.info(f"🎤 [MIC_CONTROL] Abort時AI発話停止: client_is_speaking=False")
             
             # ESP32にTTS停止メッセージ送信 (server2準拠)
-            abort_message = {
-                "type": "tts", 
-                "state": "stop", 
-                "session_id": getattr(self, 'session_id', 'unknown')
-            }
-            if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
-                logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send abort message - connection dead")
-                return
-            await self.websocket.send_str(json.dumps(abort_message))
-            logger.info(f"🔥 RID[{rid}] TTS_ABORT_SENT: Sent TTS stop message to ESP32")
-            
             # Abort後の録音再開制御（audio_control削除 - 状態遷移ベースに戻す）
             # mic_on_message = {
             #     "type": "audio_control", 
             #     "action": "mic_on", 
             #     "reason": "abort_recovery"
             # }
-            listen_start_message = {
-                "type": "listen", 
-                "state": "start", 
-                "mode": "continuous"
-            }
+            if _ws_dead(self.websocket):
+                logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send abort message - connection dead")
+                return
             try:
-                if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
-                    logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send recovery messages - connection dead")
-                    return
-                await self.websocket.send_str(json.dumps(mic_on_message))
-                await self.websocket.send_str(json.dumps(listen_start_message))
-                logger.info(f"🔥 RID[{rid}] ABORT_RECOVERY: マイクON+録音再開指示送信完了")
+                # TTS停止→録音再開の順で送信
+                await self._send_control_batch(self._tts_stop_json, self._listen_start_json)
+                logger.info(f"🔥 RID[{rid}] TTS_ABORT_SENT: Sent TTS stop message to ESP32")
+                logger.info(f"🔥 RID[{rid}] ABORT_RECOVERY: 録音再開指示送信完了")
             except Exception as e:
                 logger.warning(f"🔥 RID[{rid}] ABORT_RECOVERY_FAILED: {e}")
             
             # 音声処理状態クリア
-            if hasattr(self.audio_handler, 'asr_audio'):
-                self.audio_handler.asr_audio.clear()
-            if hasattr(self.audio_handler, 'is_processing'):
-                logger.warning(f"🔥 RID[{rid}] IS_PROCESSING_ABORT: Setting is_processing=False")
-                self.audio_handler.is_processing = False
+            self.audio_handler._drop_asr_frames()
+            logger.warning(f"🔥 RID[{rid}] IS_PROCESSING_ABORT: Setting is_processing=False")
+            self.audio_handler.is_processing = False
                 
             logger.info(f"🔥 RID[{rid}] HANDLE_ABORT_MESSAGE_END: TTS interruption handled")
             
@@ -871,35 +889,24 @@ class ConnectionHandler:
     async def handle_barge_in_abort(self):
         """Server2のhandleAbortMessage相当処理"""
         try:
-            # 呼び出し元を詳細追跡
-            import traceback
-            full_stack = traceback.format_stack()
-            caller_details = []
-            for i, frame in enumerate(full_stack[-4:-1]):
-                caller_details.append(f"Level{i}: {frame.strip()}")
+            # 呼び出し元を追跡（スタック全体は整形せず直近3フレームのみ、整形はログ出力時）
+            caller = sys._getframe(1)
             
             logger.warning("🚨 [BARGE_IN_ABORT] Handling TTS interruption - server2 style")
-            logger.warning(f"🔍 [ABORT_CALL_STACK] {' | '.join(caller_details)}")
+            logger.opt(lazy=True).warning("🔍 [ABORT_CALL_STACK] {}", lambda: _format_callers(caller))
             
             # TTS停止状態設定
             self.tts_active = False
             self._processing_text = False
             
             # ESP32にTTS停止メッセージ送信 (server2準拠)
-            abort_message = {
-                "type": "tts", 
-                "state": "stop", 
-                "session_id": getattr(self, 'session_id', 'unknown')
-            }
-            await self.websocket.send_str(json.dumps(abort_message))
+            await self.websocket.send_str(self._tts_stop_json)
             logger.info("📱 [TTS_ABORT] Sent TTS stop message to ESP32")
             
             # 音声処理状態クリア
-            if hasattr(self.audio_handler, 'asr_audio'):
-                self.audio_handler.asr_audio.clear()
-            if hasattr(self.audio_handler, 'is_processing'):
-                logger.warning(f"🚨 [IS_PROCESSING_ABORT] Setting is_processing=False in handle_barge_in_abort")
-                self.audio_handler.is_processing = False
+            self.audio_handler._drop_asr_frames()
+            logger.warning(f"🚨 [IS_PROCESSING_ABORT] Setting is_processing=False in handle_barge_in_abort")
+            self.audio_handler.is_processing = False
                 
             logger.info("✅ [BARGE_IN_ABORT] TTS interruption handled successfully")
             
@@ -910,40 +917,22 @@ class ConnectionHandler:
         """Send STT message to display user input (server2 style)"""
         try:
             # Enhanced connection check
-            if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
+            if _ws_dead(self.websocket):
                 logger.warning(f"⚠️ [WEBSOCKET] Connection closed/invalid, cannot send STT to {self.device_id}")
                 return
                 
             # Send STT message (server2 style) - テキストから句読点・絵文字除去
             cleaned_text = self._clean_text_for_display(text)
-            stt_message = {"type": "stt", "text": cleaned_text, "session_id": self.session_id}
-            if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
-                logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send STT message - connection dead")
-                return
-            await self.websocket.send_str(json.dumps(stt_message))
+            stt_json = self._stt_prefix + orjson.dumps(cleaned_text).decode() + self._session_id_suffix
+            await self.websocket.send_str(stt_json)
             logger.info(f"🟢XIAOZHI_STT_SENT🟢 📱 [STT] Sent user text to display: '{text}'")
         except Exception as e:
             logger.error(f"🔴XIAOZHI_STT_ERROR🔴 Error sending STT message to {self.device_id}: {e}")
     
     def _clean_text_for_display(self, text: str) -> str:
         """Server2準拠: テキストから句読点・絵文字を除去"""
-        if not text:
-            return text
-        
-        # 基本的な句読点・記号除去
-        punctuation_chars = "，。！？、；：（）【】「」『』〈〉《》,.!?;:()[]<>{}"
-        cleaned = text
-        
-        # 先頭・末尾の句読点・空白除去
-        start = 0
-        while start < len(cleaned) and (cleaned[start].isspace() or cleaned[start] in punctuation_chars):
-            start += 1
-            
-        end = len(cleaned) - 1
-        while end >= start and (cleaned[end].isspace() or cleaned[end] in punctuation_chars):
-            end -= 1
-            
-        return cleaned[start:end + 1] if start <= end else text
+        # 先頭・末尾の句読点・空白除去（全て除去対象なら元のテキストを返す）
+        return text.strip(_DISPLAY_STRIP_CHARS) or text
     
     def _fix_pronunciation_for_tts(self, text: str) -> str:
         """TTS用の発音修正"""
@@ -972,7 +961,6 @@ class ConnectionHandler:
     
     async def _process_alarm_request(self, text: str) -> str:
         """音声からアラーム設定を処理"""
-        import re
         import datetime
         
         try:
@@ -1101,7 +1089,6 @@ class ConnectionHandler:
                 ack_received = await self._wait_for_latest_alarm_ack(timeout=2.0)
                 
                 # asyncioインポートを先頭で実行
-                import asyncio
                 
                 if ack_received:
                     logger.info(f"✅ [OPTIMIZED_FLOW] Phase 2: ACK confirmed, waiting for WebSocket to stabilize...")
@@ -1127,7 +1114,6 @@ class ConnectionHandler:
     
     async def _wait_for_latest_alarm_ack(self, timeout: float) -> bool:
         """最新のアラームACKを待機"""
-        import asyncio
         
         # 最新のpending alarmのmessage_idを取得
         if not self.pending_alarms:
@@ -1149,7 +1135,6 @@ class ConnectionHandler:
     
     async def _process_alarm_setting_only(self, text: str) -> bool:
         """アラーム設定のみを処理（TTS応答なし）"""
-        import re
         import datetime
         
         try:
@@ -1220,7 +1205,6 @@ class ConnectionHandler:
                     hour = 0
             
             # 明日のアラームか今日のアラームか判定（UTCで計算）
-            import pytz
             utc = pytz.UTC
             current_time_utc = datetime.datetime.now(utc)
             target_date = current_time_utc.date()
@@ -1274,8 +1258,7 @@ class ConnectionHandler:
                     "duration": 3000  # 3秒表示
                 }
                 
-                import json
-                await self.websocket.send_str(json.dumps(display_msg))
+                await self.websocket.send_json(display_msg, dumps=_orjson_dumps)
                 logger.info(f"📱 [FIXED_DISPLAY] Sent fixed alarm setting message to display")
                 
             else:
@@ -1286,8 +1269,7 @@ class ConnectionHandler:
                     "duration": 3000
                 }
                 
-                import json
-                await self.websocket.send_str(json.dumps(error_msg))
+                await self.websocket.send_json(error_msg, dumps=_orjson_dumps)
                 logger.info(f"📱 [FIXED_ERROR] Sent fixed error message to display")
                 
         except Exception as e:
@@ -1355,7 +1337,7 @@ class ConnectionHandler:
     
     def _get_alarm_error_message(self) -> str:
         """アラーム作成失敗時のユーザーフレンドリーなメッセージを生成"""
-        if not hasattr(self, 'last_alarm_error'):
+        if self.last_alarm_error is None:
             return "アラームの設定に失敗しましたにゃん。もう一度お試しくださいにゃ。"
         
         error = self.last_alarm_error
@@ -1510,8 +1492,7 @@ class ConnectionHandler:
             return
         
         try:
-            import json
-            await self.websocket.send_str(json.dumps(alarm_msg))
+            await self.websocket.send_json(alarm_msg, dumps=_orjson_dumps)
             logger.info(f"🔄 [ALARM_RESEND] Retry {retry_count + 1}/{max_retries} for message: {message_id}")
             
             # 次回タイムアウト設定
@@ -1547,7 +1528,6 @@ class ConnectionHandler:
     
     def _start_keepalive_for_alarm(self, date, hour, minute):
         """アラーム時刻までキープアライブを送信"""
-        import asyncio
         import datetime
         
         async def keepalive_task():
@@ -1559,14 +1539,13 @@ class ConnectionHandler:
                     # 25秒間隔でキープアライブ（30秒スリープより短く）
                     await asyncio.sleep(25)
                     
-                    if hasattr(self, 'websocket') and self.websocket:
+                    if self.websocket:
                         keepalive_msg = {
                             "type": "keepalive",
                             "timestamp": datetime.datetime.now().isoformat(),
                             "message": "アラーム待機中..."
                         }
-                        import json
-                        await self.websocket.send_str(json.dumps(keepalive_msg))
+                        await self.websocket.send_json(keepalive_msg, dumps=_orjson_dumps)
                         logger.debug(f"⏰ [KEEPALIVE] Sent keepalive message")
                     else:
                         logger.warning(f"⏰ [KEEPALIVE] WebSocket connection lost")
@@ -1581,111 +1560,133 @@ class ConnectionHandler:
         asyncio.create_task(keepalive_task())
 
     async def send_audio_response(self, text: str, rid: str = None):
+        """Generate and send audio response（専用タスクで送信し、中断はタスクのcancelで行う）"""
+        if not rid:
+            rid = self._next_rid()
+        
+        # 並行TTS検知: 前のTTSタスクが送信中なら中断して引き継ぐ
+        # 発話は続くためhandle_abort_message（TTS停止・録音再開送信、ゲート解除、ASRバッファ破棄）は使わない
+        prev_task = self._tts_task
+        if prev_task is not None and not prev_task.done():
+            logger.warning(f"🔥 RID[{rid}] PARALLEL_TTS: 並行TTS検知 - 前のTTSを中断して引き継ぎ")
+            # _tts_taskから外してからキャンセル: 中断したTTSのfinallyはフラグ・フラグOFFタスクに触れない
+            self._tts_task = None
+            prev_task.cancel()
+            try:
+                await asyncio.gather(prev_task, return_exceptions=True)
+            except asyncio.CancelledError:
+                # 引き継ぎ前に自身がキャンセルされた場合は送信中のTTSなし
+                self._tts_idle.set()
+                raise
+        
+        self._tts_idle.clear()
+        tts_task = asyncio.ensure_future(self._send_audio_response(text, rid))
+        self._tts_task = tts_task
+        try:
+            await tts_task
+        except asyncio.CancelledError:
+            # 呼び出し側自身のキャンセルはそのまま伝播、TTSタスクのみの中断は正常終了扱い
+            if asyncio.current_task().cancelling():
+                raise
+            logger.info(f"🔥 RID[{rid}] TTS_CANCELLED: TTS送信を中断")
+        finally:
+            if self._tts_task is tts_task:
+                self._tts_task = None
+                self._tts_idle.set()
+
+    async def _send_audio_response(self, text: str, rid: str = None):
         """Generate and send audio response"""
+        # ターン中に何度も参照する属性はローカルに束縛（接続中は不変）
+        ws = self.websocket
+        audio_handler = self.audio_handler
         try:
             if not rid:
-                import uuid
-                rid = str(uuid.uuid4())[:8]
+                rid = self._next_rid()
             
             # 🎯 検索可能ログ: TTS開始
             logger.info(f"🔥 RID[{rid}] TTS_GENERATION_START: '{text[:50]}...'")
             
-            # 並行TTS検知
-            if hasattr(self, 'tts_active') and self.tts_active:
-                logger.warning(f"🔥 RID[{rid}] HANDLE_ABORT_MESSAGE: 並行TTS検知 - 前のTTSを中断")
-                await self.handle_abort_message(rid, "parallel_tts")
-            
             # 🔇 CRITICAL: TTS生成前に即座にマイクオフ（エコー予防）
             self.client_is_speaking = True
-            if hasattr(self, 'audio_handler'):
-                self.audio_handler.client_is_speaking = True  # 最優先でマイクオフ
-                
-                # Server2準拠: TTS開始保護期間設定（1200ms）
-                tts_lock_ms = 1200
-                self.audio_handler.speak_lock_until = time.time() * 1000 + tts_lock_ms
-                logger.info(f"🛡️ [TTS_PROTECTION] TTS開始保護期間設定: {tts_lock_ms}ms")
-                
-                # 🎯 [HALF_DUPLEX] ハーフデュプレックス制御: audio_control削除 - 状態遷移ベースに戻す
-                # mic_control_message = {
-                #     "type": "audio_control", 
-                #     "action": "mic_off", 
-                #     "reason": "tts_speaking"
-                # }
-                # try:
-                #     # 🔍 [CONNECTION_GUARD] 送信前WebSocket状態確認
-                #     if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
-                #         logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send mic_off control - connection dead")
-                #         return
-                #         
-                #     await self.websocket.send_str(json.dumps(mic_control_message))
-                #     logger.info(f"📡 [DEVICE_CONTROL] 端末にマイクオフ指示送信: {mic_control_message}")
-                    
-                # 🎯 [VAD_CONTROL] ESP32のVADバイパス指示（常時送信モード）
-                try:
-                    vad_control_message = {
-                        "type": "vad_control", 
-                        "action": "disable",  # disable = VADバイパス（常時送信）
-                        "reason": "ai_speaking_preroll"  # プリロール対応
-                    }
-                    await self.websocket.send_str(json.dumps(vad_control_message))
-                    logger.info(f"📡 [VAD_CONTROL] 端末にVADバイパス指示送信: {vad_control_message} (常時送信モード)")
+            audio_handler.client_is_speaking = True  # 最優先でマイクオフ
+                
+            # Server2準拠: TTS開始保護期間設定（1200ms）
+            tts_lock_ms = 1200
+            audio_handler.speak_lock_until = time.monotonic_ns() // 1_000_000 + tts_lock_ms
+            logger.info(f"🛡️ [TTS_PROTECTION] TTS開始保護期間設定: {tts_lock_ms}ms")
+                
+            # 🎯 [HALF_DUPLEX] ハーフデュプレックス制御: audio_control削除 - 状態遷移ベースに戻す
+            # mic_control_message = {
+            #     "type": "audio_control", 
+            #     "action": "mic_off", 
+            #     "reason": "tts_speaking"
+            # }
+            # try:
+            #     # 🔍 [CONNECTION_GUARD] 送信前WebSocket状態確認
+            #     if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
+            #         logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send mic_off control - connection dead")
+            #         return
+            #         
+            #     await self.websocket.send_str(json.dumps(mic_control_message))
+            #     logger.info(f"📡 [DEVICE_CONTROL] 端末にマイクオフ指示送信: {mic_control_message}")
+                    
+            # 🎯 [VAD_CONTROL] ESP32のVADバイパス指示（常時送信モード）
+            try:
+                await ws.send_str(self._vad_disable_json)
+                logger.info(f"📡 [VAD_CONTROL] 端末にVADバイパス指示送信: {self._vad_disable_json} (常時送信モード)")
                     
-                    # 🎯 [ACK_WAIT] ACK待機（100ms短縮）またはフォールバック
+                # 🎯 [ACK_WAIT] ACK待機（100ms短縮）またはフォールバック
+                # ACKはhandle_ack_messageでイベントをセット（ポーリングせず受信時に1回だけ起床）
+                mic_ack_event = self._mic_ack_event
+                try:
+                    await asyncio.wait_for(mic_ack_event.wait(), 0.1)  # 100ms短縮待機
+                    ack_received = True
+                except asyncio.TimeoutError:
                     ack_received = False
-                    wait_start = time.monotonic()
-                    while time.monotonic() - wait_start < 0.1:  # 100ms短縮待機
-                        await asyncio.sleep(0.01)  # 10ms間隔でチェック
-                        # ACKはhandle_text_messageで処理される
-                        if hasattr(self, '_mic_ack_received') and self._mic_ack_received:
-                            ack_received = True
-                            self._mic_ack_received = False  # リセット
-                            break
-                        
-                        if ack_received:
-                            logger.info(f"✅ [ACK_RECEIVED] MIC_OFF ACK received, starting TTS")
-                        else:
-                            logger.info(f"⏱️ [ACK_TIMEOUT] MIC_OFF ACK timeout (100ms), but ESP32 firmware has mic control - proceeding with TTS")
+                finally:
+                    mic_ack_event.clear()  # リセット
+                    
+                if ack_received:
+                    logger.info(f"✅ [ACK_RECEIVED] MIC_OFF ACK received, starting TTS")
+                else:
+                    logger.info(f"⏱️ [ACK_TIMEOUT] MIC_OFF ACK timeout (100ms), but ESP32 firmware has mic control - proceeding with TTS")
                             
-                except Exception as e:
-                    logger.warning(f"📡 [DEVICE_CONTROL] マイクオフ指示送信失敗: {e}")
-                
-                # TTS開始時に録音バッファをクリア（溜まったフレーム一斉処理防止）
-                if hasattr(self.audio_handler, 'audio_frames'):
-                    cleared_frames = len(self.audio_handler.audio_frames)
-                    self.audio_handler.audio_frames.clear()
-                    if cleared_frames > 0:
-                        logger.info(f"🗑️ [BUFFER_CLEAR] TTS開始時バッファクリア: {cleared_frames}フレーム破棄")
-                
-                logger.info(f"🎯 [CRITICAL_TEST] TTS開始: AI発言フラグON - エコーブロック開始")
-                
-                # Server2準拠: 端末にTTS開始メッセージ送信（重要！）
-                tts_start_message = {
-                    "type": "tts", 
-                    "state": "start", 
-                    "session_id": getattr(self, 'session_id', 'default')
-                }
-                if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
-                    logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send TTS start message - connection dead")
-                    return
-                await self.websocket.send_str(json.dumps(tts_start_message))
-                logger.info(f"📡 [DEVICE_CONTROL] 端末にTTS開始指示送信: {tts_start_message}")
+            except Exception as e:
+                logger.warning(f"📡 [DEVICE_CONTROL] マイクオフ指示送信失敗: {e}")
+                
+            # TTS開始時に録音バッファをクリア（溜まったフレーム一斉処理防止）
+            cleared_frames = audio_handler._drop_asr_frames()
+            if cleared_frames > 0:
+                logger.info(f"🗑️ [BUFFER_CLEAR] TTS開始時バッファクリア: {cleared_frames}フレーム破棄")
+                
+            logger.info(f"🎯 [CRITICAL_TEST] TTS開始: AI発言フラグON - エコーブロック開始")
                 
-                self.audio_handler.tts_in_progress = True
-                # TTS送信中は is_processing を強制維持
-                self.audio_handler.is_processing = True
-                handler_id = id(self.audio_handler)
-                logger.info(f"🎤 [MIC_CONTROL] AI発話開始: client_is_speaking=True (エコー防止), handler_id={handler_id}")
-                logger.info(f"🛡️ [TTS_PROTECTION] Set is_processing=True for TTS protection")
+            # Server2準拠: 端末にTTS開始メッセージ送信（重要！）
+            if _ws_dead(ws):
+                logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send TTS start message - connection dead")
+                return
+            await ws.send_str(self._tts_start_json)
+            logger.info(f"📡 [DEVICE_CONTROL] 端末にTTS開始指示送信: {self._tts_start_json}")
+            # ハンドシェイク待ち: ESP32の音声受信準備（500ms）はTTS生成と並行して経過させ、
+            # 初回フレーム送信前に残り時間のみ待機する
+            tts_ready_at = time.monotonic() + 0.5
+                
+            audio_handler.tts_in_progress = True
+            # TTS送信中は is_processing を強制維持
+            audio_handler.is_processing = True
+            handler_id = id(audio_handler)
+            logger.info(f"🎤 [MIC_CONTROL] AI発話開始: client_is_speaking=True (エコー防止), handler_id={handler_id}")
+            logger.info(f"🛡️ [TTS_PROTECTION] Set is_processing=True for TTS protection")
             
             # Check if websocket is still open (server2 style)
             # Enhanced connection validation
-            if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
+            if _ws_dead(ws):
                 logger.warning(f"⚠️ [WEBSOCKET] Connection closed/invalid, cannot send audio to {self.device_id}")
                 return
             
             # Additional check: ensure websocket is still connected
-            if not hasattr(self, 'websocket') or not self.websocket:
-                logger.error(f"❌ [WEBSOCKET] WebSocket not connected: websocket={getattr(self, 'websocket', None)}")
+            if not ws:
+                logger.error(f"❌ [WEBSOCKET] WebSocket not connected: websocket={ws}")
                 return
             
             # Generate audio using TTS
@@ -1696,38 +1697,15 @@ class ConnectionHandler:
             if tts_text != text:
                 logger.info(f"🗣️ [PRONUNCIATION_FIX] '{text}' → '{tts_text}'")
             
-            # Send TTS start message (server2 style)
-            try:
-                tts_start_msg = {
-                    "type": "tts", 
-                    "state": "start", 
-                    "session_id": self.session_id
-                }
-                if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
-                    logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send TTS start - connection dead")
-                    return
-                await self.websocket.send_str(json.dumps(tts_start_msg))
-                logger.info(f"📢 [TTS] Sent TTS start message")
-                
-                # ハンドシェイク待ち: ESP32の音声受信準備完了まで待機
-                logger.info(f"⏳ [HANDSHAKE] Waiting 500ms for ESP32 audio readiness")
-                await asyncio.sleep(0.5)  # 500ms待機
-            except Exception as status_error:
-                logger.warning(f"⚠️ [TTS] Failed to send TTS start: {status_error}")
-                return
+            # TTS開始メッセージは上で送信済み（二重送信しない）
             
             # Send sentence_start message with AI text (server2 critical addition)
             try:
-                sentence_msg = {
-                    "type": "tts",
-                    "state": "sentence_start", 
-                    "text": text,
-                    "session_id": self.session_id
-                }
-                if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
+                sentence_json = self._sentence_start_prefix + orjson.dumps(text).decode() + self._session_id_suffix
+                if _ws_dead(ws):
                     logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send TTS display - connection dead")
                     return
-                await self.websocket.send_str(json.dumps(sentence_msg))
+                await ws.send_str(sentence_json)
                 logger.info(f"🟢XIAOZHI_TTS_DISPLAY_SENT🟢 📱 [TTS_DISPLAY] Sent AI text to display: '{text}'")
             except Exception as sentence_error:
                 logger.error(f"🔴XIAOZHI_TTS_DISPLAY_ERROR🔴 ⚠️ [TTS] Failed to send sentence_start: {sentence_error}")
@@ -1736,126 +1714,169 @@ class ConnectionHandler:
             # Server2準拠: stop_eventチェック削除（TTS中断なし）
             
             # TTS処理前の接続状態チェック
-            logger.info(f"🔍 [CONNECTION_CHECK] Before TTS generation: closed={self.websocket.closed}")
+            logger.debug("🔍 [CONNECTION_CHECK] Before TTS generation: closed={}", ws.closed)
             
             # TTS生成中のタイムアウト対策：活動状態更新
-            self.last_activity_time = time.time()
+            self.last_activity_time = time.monotonic()
             
             # Generate TTS audio (server2 style - individual frames)
-            opus_frames_list = await self.tts_service.generate_speech(tts_text)
-            logger.info(f"🎶 [TTS_RESULT] ===== TTS generated: {len(opus_frames_list) if opus_frames_list else 0} individual Opus frames =====")
+            # 生成できたセグメントから順に受け取り、次セグメントの生成と送信を重ねる（全文の合成完了を待たない）
+            # 生成器の作成から閉じるまでを1つのtry/finallyで囲む（最初のセグメント生成中の中断でもacloseする）
+            frame_chunks = None
+            next_chunk_task = None
+            try:
+                frame_chunks = self.tts_service.stream_speech(tts_text)
+                opus_frames_list = await anext(frame_chunks, None)
+                logger.info(f"🎶 [TTS_RESULT] ===== TTS first segment generated: {len(opus_frames_list) if opus_frames_list else 0} individual Opus frames =====")
             
-            # TTS処理後の活動状態更新とタイムアウト対策
-            self.last_activity_time = time.time()
-            logger.info(f"🔍 [CONNECTION_CHECK] After TTS generation: closed={self.websocket.closed}")
+                # TTS処理後の活動状態更新とタイムアウト対策
+                self.last_activity_time = time.monotonic()
+                logger.debug("🔍 [CONNECTION_CHECK] After TTS generation: closed={}", ws.closed)
             
-            # Server2完全移植: sendAudioHandle.py line 36-45 直接移植
-            if opus_frames_list:
-                try:
-                    # 送信直前の最終接続確認
-                    if self.websocket.closed:
-                        logger.error(f"🚨 [CONNECTION_ERROR] WebSocket already closed before audio send")
-                        return
-                    
-                    # 🎯 [CRITICAL_FIX] 二重送信防止: 個別フレーム送信のみに統一
-                    total_frames = len(opus_frames_list)
-                    logger.info(f"🎵 [UNIFIED_SEND] Unified individual frame sending: {total_frames} frames")
-                    
-                    if hasattr(self, 'websocket') and self.websocket and not self.websocket.closed:
-                        # 🎯 [SERVER2_METHOD] Server2方式: bytes一括送信で安定化
-                        frame_count = len(opus_frames_list)
-                        
-                        # デバッグ：最初のフレーム詳細解析
-                        if frame_count > 0:
+                # Server2完全移植: sendAudioHandle.py line 36-45 直接移植
+                if opus_frames_list:
+                    try:
+                        # 送信直前の最終接続確認
+                        if ws.closed:
+                            logger.error(f"🚨 [CONNECTION_ERROR] WebSocket already closed before audio send")
+                            return
+                    
+                        # 🎯 [CRITICAL_FIX] 二重送信防止: 個別フレーム送信のみに統一
+                        total_frames = 0
+                        total_bytes = 0  # ログ用（セグメント受信毎に加算）
+                        logger.info(f"🎵 [UNIFIED_SEND] Unified individual frame sending (streaming segments)")
+                    
+                        if ws and not ws.closed:
+                            # デバッグ：最初のフレーム詳細解析（DEBUGを受け付けるシンクがある時のみ整形）
                             first_frame = opus_frames_list[0]
-                            logger.info(f"🔬 [OPUS_DEBUG] First frame: size={len(first_frame)}bytes, hex_header={first_frame[:8].hex() if len(first_frame)>=8 else first_frame.hex()}")
+                            logger.opt(lazy=True).debug("🔬 [OPUS_DEBUG] First frame: size={}bytes, hex_header={}", lambda: len(first_frame), lambda: first_frame[:8].hex())
+                        
+                            # ハンドシェイク残り時間の待機（TTS生成が500ms以上かかった場合は待たない）
+                            ready_wait = tts_ready_at - time.monotonic()
+                            if ready_wait > 0:
+                                logger.info(f"⏳ [HANDSHAKE] Waiting {ready_wait * 1000:.0f}ms more for ESP32 audio readiness")
+                                await asyncio.sleep(ready_wait)
                         
-                        # 🚀 [SERVER2_EXACT] Server2完全再現: 60ms間隔個別フレーム送信
-                        frame_duration_ms = 60  # Server2と同じ60ms
-                        send_start_time = time.monotonic()
+                            # 🚀 [SERVER2_EXACT] Server2完全再現: 60ms間隔個別フレーム送信
+                            frame_duration_ms = 60  # Server2と同じ60ms
+                            frame_interval = 0.050  # 1フレーム当たりの送信間隔（60msフレームより僅かに速く送り端末側バッファを維持）
+                            send_start_time = time.monotonic()
                         
-                        # 送信前のWebSocket状態詳細チェック
-                        logger.info(f"🔍 [WEBSOCKET_STATE] Before send: closed={self.websocket.closed}, state={getattr(self.websocket, 'state', 'unknown')}")
+                            # 送信前のWebSocket状態詳細チェック
+                            logger.debug("🔍 [WEBSOCKET_STATE] Before send: closed={}", ws.closed)
                         
-                        if self.websocket.closed:
-                            logger.error(f"❌ [SERVER2_EXACT] WebSocket already closed before sending")
-                            raise Exception("WebSocket closed before audio send")
+                            if ws.closed:
+                                logger.error(f"❌ [SERVER2_EXACT] WebSocket already closed before sending")
+                                raise Exception("WebSocket closed before audio send")
                         
-                        logger.info(f"🎯 [SERVER2_EXACT] Sending {frame_count} frames individually, 60ms intervals (exactly like Server2)")
+                            logger.info(f"🎯 [SERVER2_EXACT] Sending frames individually in batches of {Config.TTS_SEND_BATCH_FRAMES}")
                         
-                        try:
-                            for frame_index, opus_frame in enumerate(opus_frames_list):
-                                # WebSocket接続状態を毎フレームチェック
-                                if self.websocket.closed:
-                                    logger.error(f"❌ [SERVER2_EXACT_ERROR] WebSocket closed at frame {frame_index}/{frame_count}")
-                                    break
+                            try:
+                                # 数フレームずつまとめて連続送信し、待機はバッチ毎に1回（1フレーム=1WSメッセージは維持）
+                                # ループ内で使う属性・関数はローカルに束縛
+                                batch_frames = Config.TTS_SEND_BATCH_FRAMES
+                                send_bytes = ws.send_bytes
+                                monotonic = time.monotonic
+                                sleep = asyncio.sleep
+                                next_send_at = send_start_time
+                                send_aborted = False
+                                while opus_frames_list:
+                                    # 次セグメントの生成を先行開始し、このセグメントの送信と並行させる
+                                    next_chunk_task = asyncio.ensure_future(anext(frame_chunks, None))
+                                    total_frames += len(opus_frames_list)
+                                    total_bytes += sum(map(len, opus_frames_list))
+                                    # 生成待ちで送信予定を過ぎていたら起点を現在時刻に合わせる（遅れ分の一斉送信を防ぐ）
+                                    next_send_at = max(next_send_at, monotonic())
                                 
-                                try:
-                                    # 各フレームを個別に送信（Server2方式）
-                                    await self.websocket.send_bytes(opus_frame)
+                                    for batch_start in range(0, len(opus_frames_list), batch_frames):
+                                        # 前バッチからの送信予定時刻まで待機（音割れ防止）
+                                        # 固定sleepではなく予定時刻基準: 送信処理時間の分だけ遅れが積み上がらず、遅れている時は待たない
+                                        delay = next_send_at - monotonic()
+                                        if delay > 0:
+                                            await sleep(delay)
+                                    
+                                        # WebSocket接続状態をバッチ毎にチェック
+                                        if ws.closed:
+                                            logger.error(f"❌ [SERVER2_EXACT_ERROR] WebSocket closed at frame {total_frames - len(opus_frames_list) + batch_start}")
+                                            send_aborted = True
+                                            break
                                     
-                                    # 10フレーム毎に接続状態ログ
-                                    if frame_index % 10 == 0:
-                                        logger.debug(f"🔄 [SERVER2_PROGRESS] Frame {frame_index}/{frame_count}, WS state: closed={self.websocket.closed}")
+                                        batch = opus_frames_list[batch_start:batch_start + batch_frames]
+                                        try:
+                                            # 各フレームは個別のWSメッセージ（ESP32は1メッセージ=1 Opusパケット）
+                                            for opus_frame in batch:
+                                                await send_bytes(opus_frame)
+                                        
+                                            # 進捗ログは出力時のみ整形（loguruの遅延フォーマット）
+                                            logger.debug("🔄 [SERVER2_PROGRESS] Frame {}/{}", batch_start + len(batch), len(opus_frames_list))
+                                        
+                                        except Exception as frame_error:
+                                            logger.error(f"❌ [SERVER2_FRAME_ERROR] Frames {batch_start}-{batch_start + len(batch) - 1} failed: {frame_error}")
+                                            # フレーム送信失敗時は即座に終了
+                                            send_aborted = True
+                                            break
                                     
-                                except Exception as frame_error:
-                                    logger.error(f"❌ [SERVER2_FRAME_ERROR] Frame {frame_index} failed: {frame_error}")
-                                    # フレーム送信失敗時は即座に終了
-                                    break
+                                        next_send_at += len(batch) * frame_interval
                                 
-                                # 最後のフレーム以外は待機（50ms間隔で音質向上）
-                                if frame_index < len(opus_frames_list) - 1:
-                                    await asyncio.sleep(0.050)  # 50ms（音割れ防止）
+                                    if send_aborted:
+                                        break
+                                    opus_frames_list = await next_chunk_task
+                                    next_chunk_task = None
                             
-                            send_end_time = time.monotonic()
-                            total_send_time = (send_end_time - send_start_time) * 1000  # ms
-                            total_bytes = sum(len(frame) for frame in opus_frames_list)
+                                send_end_time = time.monotonic()
+                                total_send_time = (send_end_time - send_start_time) * 1000  # ms
                             
-                            logger.info(f"✅ [SERVER2_EXACT_SUCCESS] Sent {frame_count} frames individually: {total_send_time:.1f}ms total")
-                            logger.info(f"📊 [SERVER2_EXACT_STATS] Avg interval: {total_send_time/frame_count:.1f}ms, throughput: {total_bytes / total_send_time * 1000:.0f} bytes/sec")
+                                logger.info(f"✅ [SERVER2_EXACT_SUCCESS] Sent {total_frames} frames individually: {total_send_time:.1f}ms total")
+                                logger.info(f"📊 [SERVER2_EXACT_STATS] Avg interval: {total_send_time/total_frames:.1f}ms, throughput: {total_bytes / total_send_time * 1000:.0f} bytes/sec")
                             
-                        except Exception as send_error:
-                            logger.error(f"❌ [SERVER2_EXACT_ERROR] Failed to send individual frames: {send_error}")
+                            except Exception as send_error:
+                                logger.error(f"❌ [SERVER2_EXACT_ERROR] Failed to send individual frames: {send_error}")
                             
-                            # WebSocket切断が原因の場合は再接続を試行
-                            if "closing transport" in str(send_error) or "closed" in str(send_error):
-                                logger.warning(f"🔄 [WEBSOCKET_RECONNECT] Attempting reconnection due to transport closure")
-                                # WebSocket切断フラグをセット（アプリケーション層で再接続処理）
-                                self.websocket.closed = True
-                            raise
-                    else:
-                        logger.error(f"❌ [V3_PROTOCOL] WebSocket disconnected before send")
-                    
-                    total_bytes = sum(len(frame) for frame in opus_frames_list)
-                    logger.info(f"🔵XIAOZHI_AUDIO_SENT🔵 ※ここを送ってver2_AUDIO※ 🎵 [AUDIO_SENT] ===== Sent {total_frames} Opus frames to {self.device_id} ({total_bytes} total bytes) =====")
-                    logger.info(f"🔍 [DEBUG_SEND] WebSocket state after audio send: closed={self.websocket.closed}")
-
-                    # Send TTS stop message with cooldown info (server2 style + 回り込み防止)
-                    # レター機能中は短縮クールダウンを使用
-                    cooldown_time = 600 if self.letter_state != "none" else 1200
-                    tts_stop_msg = {"type": "tts", "state": "stop", "session_id": self.session_id, "cooldown_ms": cooldown_time}  # レター中は600ms、通常は1200ms
-                    logger.info(f"🔍 [DEBUG_SEND] About to send TTS stop message: {tts_stop_msg}")
-                    if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
-                        logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send TTS stop - connection dead")
-                        return
-                    await self.websocket.send_str(json.dumps(tts_stop_msg))
-                    logger.info(f"🟡XIAOZHI_TTS_STOP🟡 ※ここを送ってver2_TTS_STOP※ 📢 [TTS] Sent TTS stop message with cooldown={cooldown_time}ms")
-                    logger.info(f"🔍 [DEBUG_SEND] WebSocket state after TTS stop: closed={self.websocket.closed}")
-                    
-                    # Server2準拠: TTS完了後の接続制御
-                    if self.close_after_chat:
-                        logger.info(f"🔴XIAOZHI_CLOSE_AFTER_CHAT🔴 Closing connection after chat completion for {self.device_id}")
-                        await self.websocket.close()
-                        return
-                    else:
-                        logger.info(f"🔵XIAOZHI_CONTINUE_CONNECTION🔵 Maintaining connection after TTS completion for {self.device_id}")
-                        logger.info(f"🔍 [DEBUG_SEND] WebSocket final state: closed={self.websocket.closed}")
+                                # WebSocket切断が原因の場合は再接続を試行
+                                if "closing transport" in str(send_error) or "closed" in str(send_error):
+                                    logger.warning(f"🔄 [WEBSOCKET_RECONNECT] Attempting reconnection due to transport closure")
+                                    # WebSocket切断フラグをセット（アプリケーション層で再接続処理）
+                                    ws.closed = True
+                                raise
+                        else:
+                            logger.error(f"❌ [V3_PROTOCOL] WebSocket disconnected before send")
+                    
+                        logger.info(f"🔵XIAOZHI_AUDIO_SENT🔵 ※ここを送ってver2_AUDIO※ 🎵 [AUDIO_SENT] ===== Sent {total_frames} Opus frames to {self.device_id} ({total_bytes} total bytes) =====")
+                        logger.debug("🔍 [DEBUG_SEND] WebSocket state after audio send: closed={}", ws.closed)
+
+                        # Send TTS stop message with cooldown info (server2 style + 回り込み防止)
+                        # レター機能中は短縮クールダウンを使用
+                        cooldown_time = 600 if self.letter_state != "none" else 1200
+                        tts_stop_json = self._tts_stop_cooldown_json[cooldown_time]  # レター中は600ms、通常は1200ms
+                        logger.debug("🔍 [DEBUG_SEND] About to send TTS stop message: {}", tts_stop_json)
+                        if _ws_dead(ws):
+                            logger.error(f"💀 [WEBSOCKET_DEAD] Cannot send TTS stop - connection dead")
+                            return
+                        await ws.send_str(tts_stop_json)
+                        logger.info(f"🟡XIAOZHI_TTS_STOP🟡 ※ここを送ってver2_TTS_STOP※ 📢 [TTS] Sent TTS stop message with cooldown={cooldown_time}ms")
+                        logger.debug("🔍 [DEBUG_SEND] WebSocket state after TTS stop: closed={}", ws.closed)
+                    
+                        # Server2準拠: TTS完了後の接続制御
+                        if self.close_after_chat:
+                            logger.info(f"🔴XIAOZHI_CLOSE_AFTER_CHAT🔴 Closing connection after chat completion for {self.device_id}")
+                            await ws.close()
+                            return
+                        else:
+                            logger.info(f"🔵XIAOZHI_CONTINUE_CONNECTION🔵 Maintaining connection after TTS completion for {self.device_id}")
+                            logger.debug("🔍 [DEBUG_SEND] WebSocket final state: closed={}", ws.closed)
 
-                except Exception as send_error:
-                    logger.error(f"❌ [WEBSOCKET] Audio send failed to {self.device_id}: {send_error}")
-                    logger.error(f"🔍 [DEBUG_SEND] WebSocket state after error: closed={self.websocket.closed}")
-            else:
-                logger.warning(f"Failed to generate audio for {self.device_id}")
+                    except Exception as send_error:
+                        logger.error(f"❌ [WEBSOCKET] Audio send failed to {self.device_id}: {send_error}")
+                        logger.error(f"🔍 [DEBUG_SEND] WebSocket state after error: closed={ws.closed}")
+                else:
+                    logger.warning(f"Failed to generate audio for {self.device_id}")
+            finally:
+                # 送信中断時は先行生成中のセグメントを破棄してからジェネレータを閉じる
+                if next_chunk_task is not None:
+                    next_chunk_task.cancel()
+                    await asyncio.gather(next_chunk_task, return_exceptions=True)
+                if frame_chunks is not None:
+                    await frame_chunks.aclose()
                 
         except Exception as e:
             logger.error(f"Error sending audio response to {self.device_id}: {e}")
@@ -1868,34 +1889,21 @@ class ConnectionHandler:
                     # レター機能中は短縮クールダウンを使用
                     cooldown_ms = 600 if self.letter_state != "none" else 1200  # レター中は600ms、通常は1200ms
                     # 🎯 [MONOTONIC_TIME] 単一時基統一
-                    cooldown_until = time.monotonic() * 1000 + cooldown_ms
+                    cooldown_until = time.monotonic_ns() // 1_000_000 + cooldown_ms
                     
                     # TTS終了直後にクールダウン期間設定（★フラグは維持★）
-                    if hasattr(self, 'audio_handler'):
-                        self.audio_handler.tts_cooldown_until = cooldown_until
+                    audio_handler.tts_cooldown_until = cooldown_until
                         
-                        # Server2準拠: TTS終了時の完全バッファクリア（重要）
-                        logger.info(f"🧹 [BUFFER_CLEAR_TTS_END] TTS終了時バッファクリア開始")
+                    # Server2準拠: TTS終了時の完全バッファクリア（重要）
+                    logger.info(f"🧹 [BUFFER_CLEAR_TTS_END] TTS終了時バッファクリア開始")
                         
-                        # 1. ASR音声バッファクリア（クールダウン明けの流入防止）
-                        if hasattr(self.audio_handler, 'audio_frames'):
-                            cleared_frames = len(self.audio_handler.audio_frames)
-                            self.audio_handler.audio_frames.clear()
-                            logger.info(f"🧹 [ASR_BUFFER_CLEAR] ASRフレームバッファクリア: {cleared_frames}フレーム")
+                    # 1. ASR音声バッファクリア（クールダウン明けの流入防止）
+                    # 2. VAD状態リセット（server2のreset_vad_states準拠）
+                    cleared_frames = audio_handler.reset_listen_state()
+                    logger.info(f"🧹 [ASR_BUFFER_CLEAR] ASRフレームバッファクリア: {cleared_frames}フレーム")
+                    logger.info(f"🧹 [VAD_RESET] VAD状態リセット完了")
                         
-                        # 2. VAD状態リセット（server2のreset_vad_states準拠）
-                        if hasattr(self.audio_handler, 'silence_count'):
-                            self.audio_handler.silence_count = 0
-                        if hasattr(self.audio_handler, 'last_voice_time'):
-                            self.audio_handler.last_voice_time = 0
-                        if hasattr(self.audio_handler, 'wake_until'):
-                            self.audio_handler.wake_until = 0
-                        logger.info(f"🧹 [VAD_RESET] VAD状態リセット完了")
-                        
-                        # 3. RMSアキュムレータクリア
-                        if hasattr(self.audio_handler, '_rms_buffer'):
-                            self.audio_handler._rms_buffer = []
-                        logger.info(f"🧹 [RMS_RESET] RMSバッファリセット完了")
+                    # 3. RMS判定はフレーム単位（_detect_voice_with_rms）で蓄積バッファを持たないためリセット不要
                     
                     logger.info(f"🎯 [CRITICAL_TEST] TTS送信完了: フラグ維持中、クールダウン{cooldown_ms}ms開始、バッファ完全クリア")
                     
@@ -1903,98 +1911,92 @@ class ConnectionHandler:
                     cooldown_seconds = cooldown_ms / 1000.0
                     await asyncio.sleep(cooldown_seconds)
                     
+                    # クールダウン中に次のTTSが開始済み（中断→再開を含む）ならフラグは次のTTSに任せる
+                    if self._tts_task is not None and not self._tts_task.done():
+                        logger.info(f"🎯 [CRITICAL_TEST] 次のTTS送信中のためフラグOFFをスキップ")
+                        return
+                    
                     # ★ここで初めてフラグOFF★（クールダウン満了後）
                     self.client_is_speaking = False
-                    if hasattr(self, 'audio_handler'):
-                        self.audio_handler.client_is_speaking = False  # AI発話確実終了
+                    audio_handler.client_is_speaking = False  # AI発話確実終了
                         
-                        # Server2準拠: 端末にTTS終了 + マイクオン指示送信
-                        tts_stop_message = {
-                            "type": "tts", 
-                            "state": "stop", 
-                            "session_id": getattr(self, 'session_id', 'default')
-                        }
-                        # mic_on_message = {
-                        #     "type": "audio_control", 
-                        #     "action": "mic_on", 
-                        #     "reason": "tts_finished"
-                        # }
-                        try:
-                            # 🔍 [CONNECTION_GUARD] WebSocket状態確認（最重要）
-                            if self.websocket.closed or getattr(self.websocket, '_writer', None) is None:
-                                logger.error(f"💀 [WEBSOCKET_DEAD] Connection closed during cooldown, cannot send control messages")
-                                return
+                    # Server2準拠: 端末にTTS終了 + マイクオン指示送信
+                    # mic_on_message = {
+                    #     "type": "audio_control", 
+                    #     "action": "mic_on", 
+                    #     "reason": "tts_finished"
+                    # }
+                    try:
+                        # 🔍 [CONNECTION_GUARD] WebSocket状態確認（最重要）
+                        if _ws_dead(ws):
+                            logger.error(f"💀 [WEBSOCKET_DEAD] Connection closed during cooldown, cannot send control messages")
+                            return
                                 
-                            # 1. TTS停止メッセージ（Server2準拠）
-                            await self.websocket.send_str(json.dumps(tts_stop_message))
+                        # 1. TTS停止メッセージは音声送信直後（cooldown_ms付き）に送信済みのため再送しない
                             
-                            # 2. マイクオン指示（audio_control削除 - 状態遷移ベースに戻す）
-                            # await self.websocket.send_str(json.dumps(mic_on_message))
+                        # 2. マイクオン指示（audio_control削除 - 状態遷移ベースに戻す）
+                        # await self.websocket.send_str(json.dumps(mic_on_message))
                             
-                            # 3. VAD判定復帰指示（ハングオーバ対応）
-                            vad_enable_message = {
-                                "type": "vad_control",
-                                "action": "enable",  # enable = VAD判定復帰
-                                "reason": "ai_finished_hangover"  # ハングオーバー対応
-                            }
-                            await self.websocket.send_str(json.dumps(vad_enable_message))
-                            
-                            # 4. 録音再開指示（重要！ESP32が自動再開しない場合の保険）
-                            listen_start_message = {
-                                "type": "listen", 
-                                "state": "start", 
-                                "mode": "continuous"
-                            }
-                            await self.websocket.send_str(json.dumps(listen_start_message))
+                        # 3. VAD判定復帰指示（ハングオーバ対応）
+                        # 4. 録音再開指示（重要！ESP32が自動再開しない場合の保険）
+                        # 2通は連続して書き込み、drain待ちはまとめて行う（送信順は維持）
+                        await self._send_control_batch(self._vad_enable_json, self._listen_start_json)
                             
-                            logger.info(f"📡 [DEVICE_CONTROL] 端末制御送信完了: TTS停止→マイクON→VAD判定復帰→録音再開")
-                            logger.info(f"📡 [DEVICE_CONTROL] Messages: {tts_stop_message}, {mic_on_message}, {vad_enable_message}, {listen_start_message}")
-                            logger.info(f"🎯 [VAD_STRATEGY] VADバイパス→通常判定復帰でプリロール/ハングオーバー対応")
-                        except Exception as e:
-                            logger.warning(f"📡 [DEVICE_CONTROL] 端末制御送信失敗: {e}")
-                            logger.error(f"💀 [WEBSOCKET_ERROR] WebSocket状態: closed={getattr(self.websocket, 'closed', 'unknown')}, writer={getattr(self.websocket, '_writer', 'unknown')}")
+                        logger.info(f"📡 [DEVICE_CONTROL] 端末制御送信完了: VAD判定復帰→録音再開")
+                        logger.debug("📡 [DEVICE_CONTROL] Messages: {}, {}", self._vad_enable_json, self._listen_start_json)
+                        logger.info(f"🎯 [VAD_STRATEGY] VADバイパス→通常判定復帰でプリロール/ハングオーバー対応")
+                    except Exception as e:
+                        logger.warning(f"📡 [DEVICE_CONTROL] 端末制御送信失敗: {e}")
+                        logger.error(f"💀 [WEBSOCKET_ERROR] WebSocket状態: closed={getattr(ws, 'closed', 'unknown')}, writer={getattr(ws, '_writer', 'unknown')}")
                         
-                        # D. 可視化（デバッグ）- TTS区間統計出力
-                        ws_blocked = getattr(self, '_ws_block_count', 0)
-                        ws_gate_total = getattr(self, 'ws_gate_drops', 0)
-                        audio_blocked = getattr(self.audio_handler.handler if hasattr(self.audio_handler, 'handler') else None, 'blocked_frames', 0) if hasattr(self, 'audio_handler') else 0
-                        cooldown_blocked = getattr(self.audio_handler, '_cooldown_log_count', 0) if hasattr(self, 'audio_handler') else 0
+                    # D. 可視化（デバッグ）- TTS区間統計出力
+                    ws_blocked = self._ws_block_count
+                    ws_gate_total = self.ws_gate_drops
+                    audio_blocked = self.connection_handler.blocked_frames
+                    cooldown_blocked = audio_handler._cooldown_log_count
                         
-                        logger.info(f"🎯 [CRITICAL_TEST] クールダウン満了: AI発言フラグOFF - WebSocket入口ガード解除")
-                        logger.info(f"📊 [TTS_GUARD] WS入口blocked={ws_blocked} (累計={ws_gate_total}) Audio層blocked={audio_blocked} Cooldown期間blocked={cooldown_blocked}")
+                    logger.info(f"🎯 [CRITICAL_TEST] クールダウン満了: AI発言フラグOFF - WebSocket入口ガード解除")
+                    logger.info(f"📊 [TTS_GUARD] WS入口blocked={ws_blocked} (累計={ws_gate_total}) Audio層blocked={audio_blocked} Cooldown期間blocked={cooldown_blocked}")
                         
-                        # カウンターリセット（累計は維持）
-                        if hasattr(self, '_ws_block_count'):
-                            self._ws_block_count = 0
+                    # カウンターリセット（累計は維持）
+                    self._ws_block_count = 0
                             
                 except Exception as e:
                     logger.error(f"🚨 [FLAG_OFF_ERROR] 遅延フラグOFFエラー: {e}")
                     # エラー時も確実にフラグOFF（安全弁）
                     self.client_is_speaking = False
-                    if hasattr(self, 'audio_handler'):
-                        self.audio_handler.client_is_speaking = False
-            
-            # ★TTS終了直後はフラグOFFしない★（従来の即座リセットを削除）
-            # 唯一の例外対策として is_processing のみリセット
-            if hasattr(self, 'audio_handler'):
-                self.audio_handler.tts_in_progress = False
-                self.audio_handler.is_processing = False
-                
-            # 非同期でクールダウン後フラグOFF実行
-            asyncio.create_task(delayed_flag_off())
-            
-            logger.info(f"🔥 RID[{rid if 'rid' in locals() else 'unknown'}] TTS_COMPLETE: is_processing=False, フラグ維持中({1200}ms後OFF)")
+                    audio_handler.client_is_speaking = False
+            
+            # 中断後に次のTTSが開始済みなら共有フラグ・フラグOFFタスクは次のTTSに任せる
+            if self._tts_task is asyncio.current_task():
+                # ★TTS終了直後はフラグOFFしない★（従来の即座リセットを削除）
+                # 唯一の例外対策として is_processing のみリセット
+                audio_handler.tts_in_progress = False
+                audio_handler.is_processing = False
+                
+                # 非同期でクールダウン後フラグOFF実行（前のTTSのフラグOFF待ちは破棄し、最新のTTSのみが解除する）
+                prev_flag_off = self._flag_off_task
+                if prev_flag_off is not None and not prev_flag_off.done():
+                    prev_flag_off.cancel()
+                # 接続終了処理中（run()のfinallyでのキャンセル）は新たなフラグOFFタスクを作らない
+                if not self.stop_event.is_set():
+                    self._flag_off_task = asyncio.create_task(delayed_flag_off())
+            
+                logger.info(f"🔥 RID[{rid if 'rid' in locals() else 'unknown'}] TTS_COMPLETE: is_processing=False, フラグ維持中({1200}ms後OFF)")
+            else:
+                logger.info(f"🔥 RID[{rid if 'rid' in locals() else 'unknown'}] TTS_COMPLETE: 次のTTS開始済みのためフラグ処理をスキップ")
 
     async def run(self):
         """Main connection loop - Server2 style with audio sync"""
+        alarm_task = None
         try:
             logger.info(f"🟢XIAOZHI_LOOP_START🟢 🚀 [WEBSOCKET_LOOP] Starting message loop for {self.device_id}")
             msg_count = 0
             connection_ended = False
             
-            # アラーム時刻チェックタスクを開始
-            alarm_task = asyncio.create_task(self.start_alarm_checker())
-            timeout_task = asyncio.create_task(self._check_timeout())
+            # アラーム時刻チェックタスクを開始（接続終了時にキャンセル）
+            alarm_task = asyncio.create_task(self.start_alarm_checker(), name=f"alarm-{self.device_id}")
+            self._arm_timeout(self._timeout_check_interval)
             
             # 接続開始時に待機中のアラームがないかチェック
             await self._check_pending_alarms()
@@ -2002,7 +2004,7 @@ class ConnectionHandler:
             # 詳細デバッグ: WebSocketメッセージ受信完全トレース
             try:
                 logger.info(f"🔍 [DEBUG_LOOP] Starting async for loop for {self.device_id}, websocket.closed={self.websocket.closed}")
-                last_msg_time = time.time()
+                last_msg_time = time.monotonic()  # 間隔監視はNTP補正の影響を受けない単調時計で
                 
                 # 🚨 重要: Server2準拠のWebSocketメッセージ処理ループ
                 logger.info(f"🔍 [LOOP_MONITOR] About to enter async for msg in self.websocket")
@@ -2015,7 +2017,7 @@ class ConnectionHandler:
                         connection_ended = True
                         break
                     msg_count += 1
-                    current_time = time.time()
+                    current_time = time.monotonic()
                     time_since_last = current_time - last_msg_time
                     last_msg_time = current_time
                     
@@ -2044,12 +2046,12 @@ class ConnectionHandler:
                     # logger.info(f"🔍 [LOOP_MONITOR] After message processing: websocket.closed={self.websocket.closed}")  # ログ削減
                     
                     # ループ継続確認
-                    logger.debug(f"🔍 [DEBUG_LOOP] Loop iteration {msg_count} complete, about to continue async for")
+                    logger.debug("🔍 [DEBUG_LOOP] Loop iteration {} complete, about to continue async for", msg_count)
                     
                 # 🚨 async for が終了した直後の詳細ログ
                 logger.info(f"🔍 [LOOP_MONITOR] async for loop exited - investigating why")
                 logger.info(f"🔍 [DEBUG_LOOP] async for loop ended naturally for {self.device_id}, final msg_count={msg_count}")
-                logger.info(f"🔍 [DEBUG_LOOP] Time since last message when loop ended: {time.time() - last_msg_time:.1f}s")
+                logger.info(f"🔍 [DEBUG_LOOP] Time since last message when loop ended: {time.monotonic() - last_msg_time:.1f}s")
                 logger.info(f"🔍 [DEBUG_LOOP] WebSocket state: closed={self.websocket.closed}, close_code={getattr(self.websocket, 'close_code', 'None')}")
                 
                 # ESP32側切断詳細調査
@@ -2063,17 +2065,20 @@ class ConnectionHandler:
                 logger.error(f"🔥XIAOZHI_ERROR🔥 ❌ [WEBSOCKET] Loop error for {self.device_id}: {loop_error}")
                 connection_ended = True
                 
+            # 受信ループ終了: 音声送信待ちの間にタイムアウトで切断されないよう先に監視を止める
+            self._begin_shutdown()
+            
             # 音声送信待機: WebSocketが正常で音声送信待ちの場合は継続
             if not connection_ended and not self.websocket.closed:
                 logger.info(f"🎵 [WEBSOCKET_LOOP] Waiting for pending audio transmissions for {self.device_id}")
-                # 最大3秒まで音声送信完了を待機
-                wait_start = time.time()
-                while not self.websocket.closed and (time.time() - wait_start) < 3.0:
-                    await asyncio.sleep(0.1)
-                    # 実際の音声送信完了チェックはここで実装可能
-                    
-            logger.info(f"🔵XIAOZHI_LOOP_COMPLETE🔵 ✅ [WEBSOCKET_LOOP] Loop completed for {self.device_id} after {msg_count} messages")
-            logger.info(f"🔍 [DEBUG_LOOP] Final WebSocket state: closed={self.websocket.closed}, close_code={getattr(self.websocket, 'close_code', 'None')}")
+                # 最大3秒まで音声送信完了を待機（送信中でなければ即座に抜ける）
+                try:
+                    await asyncio.wait_for(self._tts_idle.wait(), timeout=3.0)
+                except asyncio.TimeoutError:
+                    logger.warning(f"🎵 [WEBSOCKET_LOOP] Pending audio not finished within 3s for {self.device_id}")
+                    
+            logger.info("🔵XIAOZHI_LOOP_COMPLETE🔵 ✅ [WEBSOCKET_LOOP] Loop completed for {} after {} messages", self.device_id, msg_count)
+            logger.info("🔍 [DEBUG_LOOP] Final WebSocket state: closed={}, close_code={}", self.websocket.closed, self.websocket.close_code)
         except Exception as e:
             logger.error(f"❌ [WEBSOCKET] Unhandled error in connection handler for {self.device_id}: {e}")
         finally:
@@ -2086,40 +2091,71 @@ class ConnectionHandler:
             else:
                 logger.warning(f"📱 RID[{self.device_id}] デバイスが接続リストに存在しません")
             
-            # Server2準拠: タイムアウト監視タスク終了
-            if self.timeout_task and not self.timeout_task.done():
-                self.timeout_task.cancel()
-                try:
-                    await self.timeout_task
-                except asyncio.CancelledError:
-                    pass
-                    
-            logger.info(f"🔍 [DEBUG] WebSocket loop ended for {self.device_id}, entering cleanup")
+            # Server2準拠: タイムアウト監視タイマー終了（例外で受信ループを抜けた場合も含め冪等）
+            self._begin_shutdown()
             
-    async def _check_timeout(self):
-        """Server2準拠: 接続タイムアウト監視"""
+            # 接続に紐づくバックグラウンドタスクを終了させてから抜ける（ハンドラより長生きさせない）
+            # タイムアウト切断タスク（_timeout_close_task）はclose完了まで走らせる
+            background_tasks = [
+                task for task in (alarm_task, self._tts_task, self._flag_off_task)
+                if task is not None and not task.done()
+            ]
+            for task in background_tasks:
+                task.cancel()
+            if background_tasks:
+                await asyncio.gather(*background_tasks, return_exceptions=True)
+                # TTSタスクの巻き戻し中に作られたフラグOFFタスクが残っていれば同様に終了させる
+                flag_off_task = self._flag_off_task
+                if flag_off_task is not None and not flag_off_task.done():
+                    flag_off_task.cancel()
+                    await asyncio.gather(flag_off_task, return_exceptions=True)
+                    background_tasks.append(flag_off_task)
+                logger.info(f"🧹 [CLEANUP] バックグラウンドタスク{len(background_tasks)}件を終了")
+                    
+            logger.info("🔍 [DEBUG] WebSocket loop ended for {}, entering cleanup", self.device_id)
+            
+    def _begin_shutdown(self):
+        """接続終了処理の開始: タイムアウト監視を停止（冪等）"""
+        self.stop_event.set()
+        if self.timeout_handle:
+            self.timeout_handle.cancel()
+            self.timeout_handle = None
+
+    def _arm_timeout(self, delay: float):
+        """Server2準拠: 接続タイムアウト監視（call_laterの単発タイマー）"""
+        if self.timeout_handle:
+            self.timeout_handle.cancel()
+        self.timeout_handle = asyncio.get_running_loop().call_later(delay, self._on_timeout)
+
+    def _on_timeout(self):
+        """タイマー発火: 期限前に活動があれば再設定、なければ切断"""
+        self.timeout_handle = None
+        if self.stop_event.is_set():
+            return
         try:
-            while not self.stop_event.is_set():
-                # 活動時間初期化チェック
-                if self.last_activity_time > 0.0:
-                    current_time = time.time()
-                    inactive_time = current_time - self.last_activity_time
-                    
-                    if inactive_time > self.timeout_seconds:
-                        if not self.stop_event.is_set():
-                            logger.info(f"🕐 [TIMEOUT] ESP32 connection timeout after {inactive_time:.1f}s for {self.device_id}")
-                            self.stop_event.set()
-                            try:
-                                await self.websocket.close()
-                            except Exception as close_error:
-                                logger.error(f"Error closing timeout connection: {close_error}")
-                        break
-                        
-                # 1秒間隔でチェック
-                await asyncio.sleep(1.0)
-                
+            now = time.monotonic()
+            # 前回確認以降に受信フレームがあれば活動時刻を同期
+            if self._activity_seq != self._activity_seq_seen:
+                self._activity_seq_seen = self._activity_seq
+                self.last_activity_time = now
+            
+            inactive_time = now - self.last_activity_time
+            if inactive_time < self.timeout_seconds:
+                self._arm_timeout(min(self.timeout_seconds - inactive_time, self._timeout_check_interval))
+                return
+            
+            logger.info("🕐 [TIMEOUT] ESP32 connection timeout after {:.1f}s for {}", inactive_time, self.device_id)
+            self.stop_event.set()
+            self._timeout_close_task = asyncio.create_task(self._close_on_timeout())
         except Exception as e:
             logger.error(f"Error in timeout check for {self.device_id}: {e}")
+
+    async def _close_on_timeout(self):
+        """タイムアウトによるWebSocket切断"""
+        try:
+            await self.websocket.close()
+        except Exception as close_error:
+            logger.error(f"Error closing timeout connection: {close_error}")
     
     async def _preload_auth_and_memory(self):
         """接続時に認証と短期記憶を事前ロード（バックグラウンド処理）"""
@@ -2137,7 +2173,7 @@ class ConnectionHandler:
                     self.user_id = user_id
                     
                     # 短期記憶プロセッサーを初期化
-                    if not hasattr(self, 'short_memory_processor'):
+                    if self.short_memory_processor is None:
                         self.short_memory_processor = ShortMemoryProcessor(user_id)
                         logger.info(f"🚀 [PRELOAD] Short memory processor initialized")
                     
@@ -2174,7 +2210,7 @@ class ConnectionHandler:
                                 self.short_memory_processor.glossary_cache = {}
                         
                         # LLMServiceのプロセッサーも同じキャッシュを共有
-                        if hasattr(self, 'llm_service') and self.llm_service:
+                        if self.llm_service:
                             if not self.llm_service.short_memory_processor:
                                 self.llm_service.set_user_id(user_id)
                             
@@ -2380,7 +2416,7 @@ class ConnectionHandler:
     async def _check_pending_alarms(self):
         """接続開始時に待機中のアラームをチェック（再接続後の即座配信）"""
         try:
-            if not hasattr(self, 'user_id') or not self.user_id:
+            if not self.user_id:
                 logger.debug(f"🔄 [PENDING_ALARM] Skipping - no user_id for {self.device_id}")
                 return
             
@@ -2430,14 +2466,9 @@ class ConnectionHandler:
         logger.debug(f"⏰ [TIMER] Checking timer command: '{text}'")
         
         # 呼び出し回数カウント（デバッグ用）
-        if not hasattr(self, 'timer_process_count'):
-            self.timer_process_count = 0
         self.timer_process_count += 1
         
         # 同じテキストの重複処理チェック
-        if not hasattr(self, 'last_timer_text'):
-            self.last_timer_text = None
-        
         if self.last_timer_text == text:
             logger.debug(f"⏰ [TIMER] Duplicate text detected: '{text}'")
             return False
@@ -2448,7 +2479,6 @@ class ConnectionHandler:
         戻り値: タイマー処理が成功した場合True、そうでなければFalse
         """
         try:
-            import re
             from datetime import datetime, timedelta
             
             # タイマー設定のパターンマッチング（アラーム関連キーワードも含める）
@@ -2507,7 +2537,7 @@ class ConnectionHandler:
             matched_pattern = None
             for pattern, time_calculator in time_patterns:
                 match = re.search(pattern, text)
-                logger.debug(f"🐛 RID[{rid}] 時間パターン '{pattern}' チェック: {match is not None}")
+                logger.debug("🐛 RID[{}] 時間パターン '{}' チェック: {}", rid, pattern, match is not None)
                 if match:
                     time_match = match
                     matched_pattern = pattern
@@ -2579,8 +2609,9 @@ class ConnectionHandler:
             
             # WebSocketでESP32に送信
             logger.info(f"🐛 RID[{rid}] WebSocket送信前: websocket.closed={self.websocket.closed}")
-            await self.websocket.send_str(json.dumps(timer_command))
-            logger.info(f"⏰ RID[{rid}] ESP32にタイマー設定コマンドを送信: {json.dumps(timer_command)}")
+            timer_command_json = orjson.dumps(timer_command).decode()
+            await self.websocket.send_str(timer_command_json)
+            logger.info(f"⏰ RID[{rid}] ESP32にタイマー設定コマンドを送信: {timer_command_json}")
             logger.info(f"🐛 RID[{rid}] WebSocket送信後: websocket.closed={self.websocket.closed}")
             
             # nekota-serverのDBにアラームを保存（一時的に無効化）
@@ -2606,14 +2637,10 @@ class ConnectionHandler:
         ESP32にタイマー停止コマンドを送信
         """
         try:
-            # ESP32に送信するメッセージ
-            stop_command = {
-                "type": "stop_timer"
-            }
-            
             # WebSocketでESP32に送信
-            await self.websocket.send_str(json.dumps(stop_command))
-            logger.info(f"⏹️ RID[{rid}] ESP32にタイマー停止コマンドを送信: {json.dumps(stop_command)}")
+            stop_command_json = self._stop_timer_json
+            await self.websocket.send_str(stop_command_json)
+            logger.info(f"⏹️ RID[{rid}] ESP32にタイマー停止コマンドを送信: {stop_command_json}")
             
             # ユーザーに確認メッセージを送信
             response_text = "わかったよ！タイマーをやめたにゃん"
@@ -2631,20 +2658,15 @@ class ConnectionHandler:
             logger.info(f"😴 [SLEEP_COMMAND] 待機モードコマンド送信開始")
             
             # ESP32に送信するメッセージ（既存のSetPowerSaveMode機能を使用）
-            sleep_command = {
-                "type": "power_save",
-                "enabled": True
-            }
-            
-            logger.info(f"😴 [SLEEP_COMMAND] 送信メッセージ準備完了: {json.dumps(sleep_command)}")
+            sleep_command_json = self._power_save_json
+            logger.info(f"😴 [SLEEP_COMMAND] 送信メッセージ準備完了: {sleep_command_json}")
             
             # WebSocketでESP32に送信
-            await self.websocket.send_str(json.dumps(sleep_command))
-            logger.info(f"😴 [SLEEP_COMMAND] ESP32に待機モードコマンドを送信: {json.dumps(sleep_command)}")
+            await self.websocket.send_str(sleep_command_json)
+            logger.info(f"😴 [SLEEP_COMMAND] ESP32に待機モードコマンドを送信: {sleep_command_json}")
             
         except Exception as e:
             logger.error(f"😴 [SLEEP_COMMAND] 待機モードコマンド送信エラー: {e}")
-            import traceback
             logger.error(f"😴 [SLEEP_COMMAND] スタックトレース: {traceback.format_exc()}")
 
     async def save_alarm_to_nekota_server(self, rid: str, seconds: int, message: str):
@@ -2657,7 +2679,6 @@ class ConnectionHandler:
             logger.error(f"🚨 [ALARM_DEBUG] ★★★ アラーム保存呼び出し ★★★ RID[{rid}] seconds={seconds}, message='{message}'")
             
             # スタックトレースで呼び出し元を特定
-            import traceback
             stack = traceback.format_stack()
             logger.error(f"🚨 [ALARM_DEBUG] 呼び出し元スタックトレース:")
             for line in stack[-5:]:  # 最後の5行のみ
@@ -2816,7 +2837,6 @@ class ConnectionHandler:
                 logger.error(f"📮 RID[{rid}] 認証失敗")
                 return {"success": False, "suggestion": None}
             
-            import aiohttp
             nekota_server_url = "https://nekota-server-production.up.railway.app"
             
             async with aiohttp.ClientSession() as session:
@@ -2877,7 +2897,6 @@ class ConnectionHandler:
             if not jwt_token or not user_id:
                 return False
             
-            import aiohttp
             nekota_server_url = "https://nekota-server-production.up.railway.app"
             
             async with aiohttp.ClientSession() as session:
@@ -2947,7 +2966,6 @@ class ConnectionHandler:
 
     def _normalize_japanese_text(self, text: str) -> list:
         """日本語テキストを正規化（ひらがな・カタカナ・漢字変換）"""
-        import unicodedata
         
         normalized_variants = [text.lower()]
         
@@ -2983,7 +3001,6 @@ class ConnectionHandler:
 
     def _extract_name_from_text(self, text: str) -> str:
         """文章から名前を抽出"""
-        import re
         
         # 不要な語句を除去するパターン
         noise_patterns = [
@@ -3060,8 +3077,6 @@ class ConnectionHandler:
         """AI解析による友達検索"""
         try:
             import httpx
-            import json
-            import os
             
             # OpenAI API設定
             api_key = os.getenv("OPENAI_API_KEY")
@@ -3107,7 +3122,7 @@ Examples:
                     content = data["choices"][0]["message"]["content"].strip()
                     
                     try:
-                        result = json.loads(content)
+                        result = orjson.loads(content)
                         matched_name = result.get("matched_name")
                         
                         if matched_name:
@@ -3120,7 +3135,7 @@ Examples:
                         logger.info(f"📮 RID[{rid}] AI友達検索: マッチなし")
                         return None
                         
-                    except json.JSONDecodeError:
+                    except orjson.JSONDecodeError:
                         logger.error(f"📮 RID[{rid}] AI友達検索: JSON解析失敗")
                         
         except Exception as e:
@@ -3161,8 +3176,7 @@ Examples:
     async def process_letter_response(self, response: str):
         """レター応答の処理"""
         try:
-            import uuid
-            rid = str(uuid.uuid4())[:8]
+            rid = self._next_rid()
             
             # レター応答状態でない場合は処理をスキップ
             if not device_letter_states.get(self.device_id, False):
@@ -3358,7 +3372,6 @@ Examples:
     async def _classify_letter_response_with_ai(self, response: str, rid: str) -> str:
         """レター応答分類（正規表現ベース）"""
         try:
-            import re
             
             # 正規表現パターンで分類（AI API不要）
             response_lower = response.lower().strip()
@@ -3408,7 +3421,6 @@ Examples:
 
     async def _process_letter_listen(self, rid: str):
         """レター聞く処理（自動読み上げ版）"""
-        import asyncio
         
         # 実際のレター内容を取得
         pending_letters = device_pending_letters.get(self.device_id, [])
@@ -3453,7 +3465,6 @@ Examples:
                 letter_content = letter.get("message", "メッセージ内容がありません")
             
             # 指示語を除去（「伝えて」「言って」など）
-            import re
             letter_content = re.sub(r'(伝えて|言って|って言って|って伝えて)$', '', letter_content).strip()
             
             from_user_name = letter.get("from_user_name", "誰か")
@@ -3540,7 +3551,6 @@ Examples:
                     
         except Exception as e:
             logger.error(f"📮 RID[{rid}] レター既読マークエラー: {e}")
-            import traceback
             logger.error(f"📮 RID[{rid}] スタックトレース: {traceback.format_exc()}")
 
 # デバイス接続チェック関数